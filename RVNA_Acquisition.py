@@ -0,0 +1,180 @@
+# Imports from python packages
+from multiprocessing import shared_memory
+import queue
+import threading
+import time
+import numpy as np
+
+from RVNA_History import LOG_COLUMNS
+from RVNA_TrendStats import TREND_COLUMNS
+from RVNA_Housekeeping import HousekeepingCache, HousekeepingThread, HOUSEKEEPING_COLUMNS
+from RVNA_Features import FEATURE_NAMES
+from RVNA_UploadOutbox import UploadOutbox, sweep_upload_entries
+
+ROW_COLUMNS = LOG_COLUMNS + TREND_COLUMNS + HOUSEKEEPING_COLUMNS + FEATURE_NAMES  # Scalar values stored with every frame
+TRACE_QUANTITIES = 5  # Frequency, S11, phase, real and imaginary Zin
+RING_SLOTS = 32
+DEFAULT_MAX_POINTS = 10001  # Largest sweep of the RVNA, used when the calibration file does not give the number of points
+NAME_BYTES = 256
+HEADER_LENGTH = 8  # int64 values: latest frame, slots, max points, row width
+
+
+def attach_shared_memory(name):  # Opens an existing block without taking ownership of it
+    try:
+        return shared_memory.SharedMemory(name, track=False)  # Python 3.13 and later
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+
+class SweepFrame:    # One sweep in the ring, the arrays are views into shared memory
+    # The values can be overwritten once the writer has gone all the way around the ring, valid() tells if they still belong to this frame
+
+    def __init__(self, ring, slot, version, frame_number):
+        self.ring = ring
+        self.slot = slot
+        self.version = version
+        self.frame_number = frame_number
+        self.row = ring.rows[slot]
+        self.trace = ring.traces[slot, :, :ring.points[slot]]
+        self.file_name = bytes(ring.names[slot]).rstrip(b"\0").decode()
+
+    def valid(self):
+        return self.ring.versions[self.slot] == self.version
+
+    def copy(self):  # Copies the values out of shared memory, True if the copy belongs to this frame
+        # Checked after the copy, a write that started while copying changes the version
+        self.row = self.row.copy()
+        self.trace = self.trace.copy()
+        return self.valid()
+
+    def values(self):  # Scalar values as a dictionary of column name to value
+        return dict(zip(ROW_COLUMNS, self.row.tolist()))
+
+
+class SweepRing:    # Fixed-size ring of sweeps in shared memory, written by the acquisition process and read by the GUI
+    # Each slot has a version counter that is odd while the slot is being written (a sequence lock), so readers never need a lock
+
+    def __init__(self, name=None, slots=RING_SLOTS, max_points=DEFAULT_MAX_POINTS, create=False):
+        if create:
+            size = 8 * (HEADER_LENGTH + 3 * slots + slots * len(ROW_COLUMNS) + slots * TRACE_QUANTITIES * max_points) + slots * NAME_BYTES
+            self.shared_memory = shared_memory.SharedMemory(name, create=True, size=size)
+            self.owner = True
+            header = np.ndarray((HEADER_LENGTH,), np.int64, self.shared_memory.buf)
+            header[:4] = [0, slots, max_points, len(ROW_COLUMNS)]
+        else:
+            self.shared_memory = attach_shared_memory(name)
+            self.owner = False
+        self.name = self.shared_memory.name
+
+        # Arrays laid out one after the other in the block
+        buffer = self.shared_memory.buf
+        self.header = np.ndarray((HEADER_LENGTH,), np.int64, buffer)
+        self.slots, self.max_points, row_width = [int(x) for x in self.header[1:4]]
+        offset = 8 * HEADER_LENGTH
+        self.versions = np.ndarray((self.slots,), np.int64, buffer, offset)
+        offset += 8 * self.slots
+        self.frames = np.ndarray((self.slots,), np.int64, buffer, offset)
+        offset += 8 * self.slots
+        self.points = np.ndarray((self.slots,), np.int64, buffer, offset)
+        offset += 8 * self.slots
+        self.rows = np.ndarray((self.slots, row_width), np.float64, buffer, offset)
+        offset += 8 * self.slots * row_width
+        self.traces = np.ndarray((self.slots, TRACE_QUANTITIES, self.max_points), np.float64, buffer, offset)
+        offset += 8 * self.slots * TRACE_QUANTITIES * self.max_points
+        self.names = np.ndarray((self.slots, NAME_BYTES), np.uint8, buffer, offset)
+
+    def latest_frame(self):  # Sequence number of the newest complete frame, 0 before the first sweep
+        return int(self.header[0])
+
+    def write(self, row, trace, file_name):  # Only called by the acquisition process
+        frame_number = self.latest_frame() + 1
+        slot = frame_number % self.slots
+        number_of_points = min(len(trace[0]), self.max_points)
+        name = file_name.encode()[:NAME_BYTES]
+
+        self.versions[slot] += 1  # Odd, readers leave the slot alone
+        self.frames[slot] = frame_number
+        self.points[slot] = number_of_points
+        self.rows[slot] = row
+        for quantity in range(TRACE_QUANTITIES):
+            self.traces[slot, quantity, :number_of_points] = trace[quantity][:number_of_points]
+        self.names[slot] = 0
+        self.names[slot, :len(name)] = np.frombuffer(name, np.uint8)
+        self.versions[slot] += 1  # Even again, the frame is complete
+        self.header[0] = frame_number
+
+    def read(self, frame_number):  # Frame with this sequence number, None if it was already overwritten
+        slot = frame_number % self.slots
+        version = int(self.versions[slot])
+        if version % 2 == 1 or self.frames[slot] != frame_number:
+            return None
+        frame = SweepFrame(self, slot, version, frame_number)
+        return frame if frame.valid() else None
+
+    def close(self):
+        # The arrays are views into the block, they have to go before it can be closed
+        self.header = self.versions = self.frames = self.points = self.rows = self.traces = self.names = None
+        self.shared_memory.close()
+        if self.owner:
+            self.shared_memory.unlink()
+
+
+def publish_sweep(ring, outbox, measurement, file_name):  # Hands a written sweep to the GUI through the ring and to the uploader through the outbox
+    history = measurement.history
+    features = [float(measurement.latest_features[name][0]) for name in FEATURE_NAMES]
+    ring.write(np.concatenate((history.tiers[0].last(), features)), history.latest_trace(), file_name)
+    outbox.enqueue_many(sweep_upload_entries(measurement.measurements_directory, file_name))
+
+
+def acquisition_process(ring_name, commands, measurements_directory, smoothing, burst_sweeps, interval, outbox_path):
+    # Runs in its own process, so the GUI and the uploads can never hold up a sweep and the measurement carries on if the GUI fails
+    import RVNA_MainWindow
+    from RVNA_MainWindow import MeasurementThread
+    from RVNA_Connection import open_rvna
+
+    ring = SweepRing(ring_name)
+    outbox = UploadOutbox(outbox_path)
+    RVNA_MainWindow.CMT = open_rvna()  # The GUI has closed its own connection before starting this process
+
+    MeasurementThread.measurements_directory = measurements_directory
+    MeasurementThread.burst_sweeps = burst_sweeps
+    measurement = MeasurementThread(smoothing)  # Its run function is called directly, no thread is started
+    written_files = []
+    measurement.measurements_filedirectory.connect(lambda files: written_files.append(files[0]))
+
+    # Temperature and status are read by their own thread, the lock keeps those reads out of the middle of a sweep
+    instrument_lock = threading.Lock()
+    MeasurementThread.housekeeping = HousekeepingCache()
+    housekeeping = HousekeepingThread(RVNA_MainWindow.CMT, instrument_lock, MeasurementThread.housekeeping)
+    housekeeping.start()
+
+    try:
+        next_sweep = time.monotonic() + interval
+        while True:
+            # Settings changed in the GUI arrive as commands while waiting for the next sweep
+            try:
+                command, value = commands.get(timeout=max(next_sweep - time.monotonic(), 0))
+            except queue.Empty:
+                command, value = "sweep", None
+            if command == "stop":
+                break
+            elif command == "interval":
+                next_sweep += value - interval
+                interval = value
+            elif command == "smoothing":
+                MeasurementThread.input_imaginary_impedance_smoothing_window = value
+            elif command == "burst":
+                MeasurementThread.burst_sweeps = value
+            elif command == "sweep":
+                next_sweep = max(next_sweep + interval, time.monotonic())  # A slow sweep delays the next one instead of causing a burst
+                try:
+                    with instrument_lock:
+                        measurement.run()
+                except Exception:  # A failed sweep is skipped, the next one is tried at its normal time
+                    continue
+                publish_sweep(ring, outbox, measurement, written_files.pop())
+    finally:  # The housekeeping thread is stopped and the instrument released however the loop ends
+        housekeeping.stop()
+        housekeeping.join()
+        RVNA_MainWindow.CMT.close()
+        ring.close()
@@ -1,31 +1,58 @@
-# Importing needed components for application
-from PySide6.QtWidgets import QApplication
-
-# sys allows for processing command line arguments
-import sys
-
-# imports MainWindow class from separate file
-from RVNA_MainWindow import RVNAMainWindow
+# Records when the application was started, used by the startup benchmark
+import time
+startup_time = time.perf_counter()
 
 # subprocess library used to executables
 import subprocess
 
-# Opening RVNA.exe external software
-RVNA_exe = subprocess.Popen("C:\\VNA\\RVNA\\RVNA.exe")
+# multiprocessing used to run the measurements in their own process
+import multiprocessing
+
+# The acquisition process imports this file again when it starts, only the application itself runs the code below
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Lets the packaged executable start the acquisition process
+
+    # Opening RVNA.exe external software first, so it starts up while the user interface is being built
+    RVNA_exe = subprocess.Popen("C:\\VNA\\RVNA\\RVNA.exe")
+
+    # Importing needed components for application
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+
+    # sys allows for processing command line arguments
+    import sys
+
+    # os used to read the startup benchmark environment variable
+    import os
+
+    # imports MainWindow class from separate file
+    from RVNA_MainWindow import RVNAMainWindow
+
+
+    # Defines python RVNA Application
+    RVNA_App = QApplication(sys.argv)
 
+    # Defines Main Widow Interface for RVNA Application, the calibration state it loads is tied to this RVNA.exe
+    Main_Window = RVNAMainWindow(RVNA_App, RVNA_exe)
+    Main_Window.show()
 
-# Defines python RVNA Application
-RVNA_App = QApplication(sys.argv)
+    # Startup Benchmark =====================================================================================
+    # When RVNA_STARTUP_BENCHMARK is set to a file path, the time until the window is shown is written to it and the application closes
+    benchmark_file = os.environ.get("RVNA_STARTUP_BENCHMARK")
+    if benchmark_file:
+        def record_startup_time():
+            with open(benchmark_file, "a") as f:
+                f.write(f"{time.perf_counter() - startup_time}\n")
+            RVNA_App.quit()
 
-# Defines Main Widow Interface for RVNA Application
-Main_Window = RVNAMainWindow(RVNA_App)
-Main_Window.show()
+        QTimer.singleShot(0, record_startup_time)  # Runs once the event loop has shown the window
+    # =======================================================================================================
 
-# Starts event loop - also a blocking function
-RVNA_App.exec()
+    # Starts event loop - also a blocking function
+    RVNA_App.exec()
 
-# closes RVNA.exe when python RVNA Application closes
-try:
-    RVNA_exe.terminate()
-except Exception:
-    pass
+    # closes RVNA.exe when python RVNA Application closes
+    try:
+        RVNA_exe.terminate()
+    except Exception:
+        pass
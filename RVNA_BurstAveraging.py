@@ -0,0 +1,52 @@
+# Imports from python packages
+import numpy as np
+
+REFERENCE_IMPEDANCE = 50.0  # Ohms
+MAD_SCALE = 1.4826  # Makes the median absolute deviation match the standard deviation of normally distributed noise
+
+
+def read_burst(instrument, number_of_sweeps):  # Triggers number_of_sweeps sweeps back-to-back, returns complex S11 as [sweep, point]
+    # SDAT returns the corrected real and imaginary parts of the selected trace whatever its display format
+    instrument.write("CALC1:PAR1:SEL")
+    sweeps = []
+    for _ in range(number_of_sweeps):
+        instrument.write("TRIG:SING")  # Trigger a single sweep
+        instrument.query("*OPC?")  # Wait for measurement to complete
+        sweeps.append(instrument.query_ascii_values("CALC1:DATA:SDAT?"))
+    data = np.asarray(sweeps, dtype=float)
+    return data[:, ::2] + 1j * data[:, 1::2]
+
+
+def electrical_delays(instrument, traces=(1, 2)):  # Electrical delay of the phase and smith chart traces in seconds
+    # FDAT of a trace has its electrical delay applied, SDAT does not, so the burst has to apply it to match a single sweep
+    delays = {}
+    for trace in traces:
+        try:
+            delays[trace] = float(instrument.query(f"CALC1:TRAC{trace}:CORR:EDEL:TIME?"))
+        except Exception:
+            delays[trace] = 0.0
+    return delays
+
+
+def average_burst(gamma, reject_outliers=True, threshold=3.5):  # Mean of the sweeps at each point, optionally without outlying sweeps
+    gamma = np.asarray(gamma)
+    if not reject_outliers or len(gamma) < 3:
+        return gamma.mean(axis=0)
+
+    # A sweep is rejected at a point when it is further than threshold robust standard deviations from the median of the burst
+    median = np.median(gamma.real, axis=0) + 1j * np.median(gamma.imag, axis=0)
+    deviation = np.abs(gamma - median)
+    spread = MAD_SCALE * np.median(deviation, axis=0)
+    keep = (deviation <= threshold * spread) | (spread == 0)
+    return (gamma * keep).sum(axis=0) / keep.sum(axis=0)
+
+
+def derived_quantities(gamma, frequency=None, delays=None, reference_impedance=REFERENCE_IMPEDANCE):  # S11 [dB], S11 phase [DEG], real and imaginary Zin [ohm]
+    # delays are the electrical delays of the phase (1) and smith chart (2) traces, applied the way the instrument formats them
+    gamma = np.asarray(gamma)
+    frequency = 0.0 if frequency is None else np.asarray(frequency)
+    delays = {} if delays is None else delays
+    phase_gamma = gamma * np.exp(2j * np.pi * frequency * delays.get(1, 0.0))
+    smith_gamma = gamma * np.exp(2j * np.pi * frequency * delays.get(2, 0.0))
+    impedance = reference_impedance * (1 + smith_gamma) / (1 - smith_gamma)
+    return 20 * np.log10(np.abs(gamma)), np.degrees(np.angle(phase_gamma)), impedance.real, impedance.imag
@@ -0,0 +1,168 @@
+# Scores calibration check sweeps against stored reference traces, used by CalibrationDialog and from the command line
+# Usage:
+#   python RVNA_CalScoring.py --cal-state 1                    (checks the free space response, exit code 0 when it passes)
+#   python RVNA_CalScoring.py --cal-state 2 --save-reference   (stores the current on body response as the reference)
+
+# Imports from python packages
+from os import path, mkdir
+import argparse
+import sys
+import time
+import numpy as np
+
+REFERENCE_DIRECTORY = "Calibration_References"
+CAL_STATE_NAMES = {1: "Free Space", 2: "On Body"}  # 1 = cal free space, 2 = cal on body, as in CalibrationDialog
+
+# Acceptance criteria
+MIN_DEPTH_DB = -10.0  # The deepest S11 point has to be below this for a resonance to be present
+FREQUENCY_WINDOW_HZ = 50e6  # Largest distance allowed between the resonance and the one of the reference
+STABILITY_SWEEPS = 5  # Number of recent sweeps that have to agree with each other
+STABILITY_HZ = 5e6  # Largest spread of the resonance frequency over those sweeps
+MAX_RMS_DB = 3.0  # Largest RMS difference between the sweep and the reference trace
+MIN_CHANGE_HZ = 10e6  # Smallest resonance shift from the previous cal state that counts as a change (antenna moved)
+MIN_CHANGE_DB = 1.0  # Smallest RMS difference from the previous cal state that counts as a change
+
+
+def reference_path(cal_state):
+    return path.join(REFERENCE_DIRECTORY, f"cal_state_{cal_state}.npz")
+
+
+def load_reference(cal_state):  # Frequency and S11 of the stored reference, None if there is none
+    try:
+        with np.load(reference_path(cal_state)) as reference:
+            return reference["frequency"], reference["s11"]
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_reference(cal_state, frequency, s11):
+    if not path.exists(REFERENCE_DIRECTORY):
+        mkdir(REFERENCE_DIRECTORY)
+    np.savez(reference_path(cal_state), frequency=np.asarray(frequency, dtype=float), s11=np.asarray(s11, dtype=float))
+
+
+def read_s11_sweep(instrument):  # Triggers one sweep and returns frequency and S11 [dB]
+    instrument.write("TRIG:SOUR BUS")  # Set sweep source to BUS for automated measurement
+    instrument.query("*OPC?")  # Wait for measurement to complete
+
+    instrument.write("TRIG:SING")  # Trigger a single sweep
+    instrument.query("*OPC?")  # Wait for measurement to complete
+
+    # Read frequency data
+    frequency = instrument.query_ascii_values("SENS1:FREQ:DATA?")
+
+    # Read log mag data
+    instrument.write("CALC1:PAR3:SEL")
+    log_mag = instrument.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
+    return frequency, log_mag[::2]
+
+
+def score_sweeps(frequency, s11, reference=None):  # Scores a stack of sweeps [sweep, point] at once, each value has one entry per sweep
+    frequency = np.asarray(frequency, dtype=float)
+    s11 = np.atleast_2d(np.asarray(s11, dtype=float))
+    deepest = np.argmin(s11, axis=1)
+    scores = {"depth_db": s11[np.arange(len(s11)), deepest], "resonance_frequency": frequency[deepest],
+              "reference_offset_hz": np.full(len(s11), np.nan), "rms_db": np.full(len(s11), np.nan)}
+    scores["resonance"] = scores["depth_db"] <= MIN_DEPTH_DB
+
+    if reference is not None:
+        reference_frequency, reference_s11 = reference
+        scores["reference_offset_hz"] = scores["resonance_frequency"] - reference_frequency[np.argmin(reference_s11)]
+        scores["rms_db"] = np.sqrt(np.mean((s11 - np.interp(frequency, reference_frequency, reference_s11)) ** 2, axis=1))
+    return scores
+
+
+class CalibrationScorer:    # Keeps the last sweeps of one cal state and decides when they meet the acceptance criteria
+
+    def __init__(self, cal_state, reference=None, previous=None):
+        self.cal_state = cal_state
+        self.reference = reference if reference is not None else load_reference(cal_state)
+        self.previous = previous  # Frequency and S11 of the previous cal state, the response has to move away from it
+        self.frequency = None
+        self.sweeps = None  # [sweep, point] ring of the most recent sweeps
+        self.count = 0
+
+    def add_sweep(self, frequency, s11):  # Returns the result of the check with this sweep included
+        if self.sweeps is None or len(frequency) != self.sweeps.shape[1]:  # First sweep, or the number of points changed
+            self.frequency = np.asarray(frequency, dtype=float)
+            self.sweeps = np.empty((STABILITY_SWEEPS, len(frequency)))
+            self.count = 0
+        self.sweeps[self.count % STABILITY_SWEEPS] = s11
+        self.count += 1
+        return self.result()
+
+    def mean_sweep(self):  # Average of the sweeps held, used as a new reference
+        return self.frequency, self.sweeps[:min(self.count, STABILITY_SWEEPS)].mean(axis=0)
+
+    def result(self):
+        scores = score_sweeps(self.frequency, self.sweeps[:min(self.count, STABILITY_SWEEPS)], self.reference)
+        latest = (self.count - 1) % STABILITY_SWEEPS
+        reasons = []
+        if not scores["resonance"].all():
+            reasons.append(f"no resonance below {MIN_DEPTH_DB:0.0f} dB")
+        if self.count < STABILITY_SWEEPS:
+            reasons.append(f"waiting for {STABILITY_SWEEPS} sweeps")
+        elif np.ptp(scores["resonance_frequency"]) > STABILITY_HZ:
+            reasons.append("resonance not stable")
+        if self.reference is not None:
+            if abs(scores["reference_offset_hz"][latest]) > FREQUENCY_WINDOW_HZ:
+                reasons.append("resonance outside the reference window")
+            if scores["rms_db"][latest] > MAX_RMS_DB:
+                reasons.append("trace differs from the reference")
+
+        # Every held sweep has to differ from the previous cal state, otherwise the antenna has not been moved yet
+        changed = None
+        if self.previous is not None:
+            previous_scores = score_sweeps(self.frequency, self.sweeps[:min(self.count, STABILITY_SWEEPS)], self.previous)
+            changed = bool(self.count >= STABILITY_SWEEPS and np.all((np.abs(previous_scores["reference_offset_hz"]) > MIN_CHANGE_HZ) |
+                                                                     (previous_scores["rms_db"] > MIN_CHANGE_DB)))
+            if not changed:
+                reasons.append(f"no change from {CAL_STATE_NAMES[self.cal_state - 1].lower()}")
+
+        passed = len(reasons) == 0
+        return {"passed": passed, "reasons": reasons, "depth_db": float(scores["depth_db"][latest]),
+                "resonance_frequency": float(scores["resonance_frequency"][latest]), "rms_db": float(scores["rms_db"][latest]),
+                "has_reference": self.reference is not None, "changed": changed,
+                "auto_advance": passed and self.reference is not None}  # Without a reference only the user can accept
+
+
+def describe(result):  # One line summary shown in CalibrationDialog and printed by the command line check
+    text = f"Resonance {result['depth_db']:0.1f} dB at {result['resonance_frequency'] / 1e6:0.1f} MHz"
+    if result["has_reference"]:
+        text += f", {result['rms_db']:0.1f} dB RMS from reference"
+    text += ": Passed" if result["passed"] else ": " + ", ".join(result["reasons"])
+    if not result["has_reference"]:
+        text += " (no reference saved, accept manually)"
+    return text
+
+
+def check_calibration(instrument, cal_state, timeout=30.0):  # Sweeps until the check passes or the timeout runs out
+    scorer = CalibrationScorer(cal_state)
+    end_time = time.monotonic() + timeout
+    while True:
+        result = scorer.add_sweep(*read_s11_sweep(instrument))
+        if result["passed"] or time.monotonic() > end_time:
+            return scorer, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks the antenna response of a calibration state without the user interface")
+    parser.add_argument("--cal-state", type=int, choices=sorted(CAL_STATE_NAMES), default=1, help="1 = free space, 2 = on body")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the check to pass")
+    parser.add_argument("--save-reference", action="store_true", help="Stores the average of the last sweeps as the reference of the cal state")
+    args = parser.parse_args()
+
+    from RVNA_Connection import open_rvna
+    instrument = open_rvna()
+
+    scorer, result = check_calibration(instrument, args.cal_state, args.timeout)
+    print(f"{CAL_STATE_NAMES[args.cal_state]}: {describe(result)}")
+    if args.save_reference:
+        save_reference(args.cal_state, *scorer.mean_sweep())
+        print(f"Reference saved to {reference_path(args.cal_state)}")
+    instrument.close()
+    sys.exit(0 if result["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Imports from python packages
+import hashlib
+
+# Trace setup sent after the calibration state is loaded, part of the fingerprint so changing it forces a reload
+TRACE_SETUP_COMMANDS = ["DISP:WIND:SPL 2",  # Allocate 2 trace windows
+                        "CALC1:PAR:COUN 3",  # 3 Traces
+                        "CALC1:PAR1:DEF S11",  # Choose S11 for trace 1
+                        "CALC1:PAR2:DEF S11",  # Choose S11 for trace 2
+                        "CALC1:PAR3:DEF S11",  # Choose S11 for trace 3
+                        "CALC1:PAR1:SEL",  # Selects Trace 1 and Phase Format
+                        "CALC1:FORM PHAS",
+                        "CALC1:PAR2:SEL",  # Selects Trace 2 and Smith Chart Format
+                        "CALC1:FORM SMIT",
+                        "CALC1:PAR3:SEL",  # Selects Trace 3 and Log Mag Format
+                        "CALC1:FORM MLOG"]
+
+# Trace formats expected on the instrument after the setup above
+TRACE_FORMATS = {1: "PHAS", 2: "SMIT", 3: "MLOG"}
+
+def cal_fingerprint(cal_file_path, setup_commands=TRACE_SETUP_COMMANDS):  # Hash of the calibration file and the trace setup
+    try:
+        with open(cal_file_path, "rb") as f:
+            cal_file_contents = f.read()
+    except OSError:
+        return None  # The file is only readable by RVNA.exe, so the state is always reloaded
+    fingerprint = hashlib.sha256(cal_file_contents)
+    fingerprint.update("\n".join(setup_commands).encode())
+    return fingerprint.hexdigest()
+
+
+def cal_file_points(cal_file_path):  # Number of sweep points saved in the calibration file
+    try:
+        with open(cal_file_path, "r", errors="ignore") as f:
+            for line in f:
+                if line.startswith("NPoints="):
+                    return int(line.split("=", 1)[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def instrument_matches_setup(instrument, cal_file_path):  # Checks the instrument still holds the trace setup and a calibration
+    try:
+        if int(float(instrument.query("CALC1:PAR:COUN?"))) != 3:
+            return False
+        for trace, trace_format in TRACE_FORMATS.items():
+            if instrument.query(f"CALC1:PAR{trace}:DEF?").strip().upper() != "S11":
+                return False
+            instrument.write(f"CALC1:PAR{trace}:SEL")
+            if instrument.query("CALC1:FORM?").strip().upper() != trace_format:
+                return False
+        if int(float(instrument.query("SENS1:CORR:STAT?"))) != 1:  # Calibration is applied
+            return False
+        points = cal_file_points(cal_file_path)
+        if points is not None and int(float(instrument.query("SENS1:SWE:POIN?"))) != points:
+            return False
+    except Exception:
+        return False  # Any unexpected reply means the state has to be reloaded
+    return True
@@ -0,0 +1,210 @@
+# Imports from python packages
+from contextlib import closing
+from datetime import datetime
+from os import path, listdir, getcwd
+import argparse
+import math
+import sqlite3
+import time
+
+# Default location of the catalog, next to the session folders it indexes
+CATALOG_PATH = getcwd() + "\\Measurement_Data\\catalog.db"
+
+# Adds one sweep to its session summary, min/max/sum are updated in place so no earlier sweeps are read
+# Frequency and temp are NULL when the sweep has none, they are left out of the statistics instead of counting as 0
+# frequency_sum_squares is taken about frequency_first, squares of the absolute frequencies lose the spread to rounding
+SESSION_UPSERT = ("INSERT INTO sessions (session, directory, start_time, sweep_count, last_elapsed, "
+                  "frequency_first, frequency_last, frequency_min, frequency_max, frequency_sum, frequency_sum_squares, frequency_count, "
+                  "impedance_min, impedance_max, impedance_sum, s11_min, s11_max, s11_sum, temp_min, temp_max, temp_sum, temp_count) "
+                  "VALUES (:session, :directory, :timestamp, 1, :elapsed, :frequency, :frequency, :frequency, :frequency, :frequency, :frequency - :frequency, "
+                  ":frequency IS NOT NULL, :impedance, :impedance, :impedance, :s11, :s11, :s11, :temp, :temp, :temp, :temp IS NOT NULL) "
+                  "ON CONFLICT (session) DO UPDATE SET "
+                  "sweep_count = sweep_count + 1, last_elapsed = excluded.last_elapsed, "
+                  "frequency_first = coalesce(frequency_first, excluded.frequency_first), frequency_last = coalesce(excluded.frequency_last, frequency_last), "
+                  "frequency_min = coalesce(min(frequency_min, excluded.frequency_min), frequency_min, excluded.frequency_min), "
+                  "frequency_max = coalesce(max(frequency_max, excluded.frequency_max), frequency_max, excluded.frequency_max), "
+                  "frequency_sum = coalesce(frequency_sum, 0) + coalesce(excluded.frequency_sum, 0), "
+                  "frequency_sum_squares = coalesce(frequency_sum_squares, 0) + "
+                  "coalesce((excluded.frequency_first - coalesce(frequency_first, excluded.frequency_first)) * (excluded.frequency_first - coalesce(frequency_first, excluded.frequency_first)), 0), "
+                  "frequency_count = frequency_count + excluded.frequency_count, "
+                  "impedance_min = min(impedance_min, excluded.impedance_min), impedance_max = max(impedance_max, excluded.impedance_max), "
+                  "impedance_sum = impedance_sum + excluded.impedance_sum, "
+                  "s11_min = min(s11_min, excluded.s11_min), s11_max = max(s11_max, excluded.s11_max), s11_sum = s11_sum + excluded.s11_sum, "
+                  "temp_min = coalesce(min(temp_min, excluded.temp_min), temp_min, excluded.temp_min), "
+                  "temp_max = coalesce(max(temp_max, excluded.temp_max), temp_max, excluded.temp_max), "
+                  "temp_sum = coalesce(temp_sum, 0) + coalesce(excluded.temp_sum, 0), temp_count = temp_count + excluded.temp_count")
+
+SWEEP_INSERT = ("INSERT OR IGNORE INTO sweeps (session, sweep_number, file_name, timestamp, elapsed, frequency, impedance, s11, temp) "
+                "VALUES (:session, :sweep_number, :file_name, :timestamp, :elapsed, :frequency, :impedance, :s11, :temp)")
+
+# Per-session summary with the derived statistics, used by the queries
+SESSION_SUMMARY = ("SELECT session, start_time, sweep_count, last_elapsed / 60.0 AS duration_min, "
+                   "frequency_sum / nullif(frequency_count, 0) / 1e6 AS frequency_mean_mhz, "
+                   "sqrt(frequency_sum_squares / nullif(frequency_count, 0) - (frequency_sum / nullif(frequency_count, 0) - frequency_first) * "
+                   "(frequency_sum / nullif(frequency_count, 0) - frequency_first)) / 1e6 AS frequency_std_mhz, "
+                   "frequency_min / 1e6 AS frequency_min_mhz, frequency_max / 1e6 AS frequency_max_mhz, "
+                   "(frequency_max - frequency_min) / 1e6 AS frequency_range_mhz, (frequency_last - frequency_first) / 1e6 AS frequency_drift_mhz, "
+                   "impedance_sum / sweep_count AS impedance_mean, s11_min, s11_sum / sweep_count AS s11_mean, "
+                   "temp_sum / nullif(temp_count, 0) AS temp_mean, temp_min, temp_max FROM sessions")
+
+
+class SessionCatalog:    # Local database of per-session and per-sweep summary values of everything under Measurement_Data
+
+    def __init__(self, database_path=CATALOG_PATH):
+        self.database_path = database_path
+        with closing(self.connect()) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")  # Kept by the database file
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                                   "session TEXT PRIMARY KEY, directory TEXT, start_time TEXT, sweep_count INTEGER, last_elapsed REAL, "
+                                   "frequency_first REAL, frequency_last REAL, frequency_min REAL, frequency_max REAL, frequency_sum REAL, frequency_sum_squares REAL, frequency_count INTEGER, "
+                                   "impedance_min REAL, impedance_max REAL, impedance_sum REAL, s11_min REAL, s11_max REAL, s11_sum REAL, "
+                                   "temp_min REAL, temp_max REAL, temp_sum REAL, temp_count INTEGER)")
+                connection.execute("CREATE TABLE IF NOT EXISTS sweeps ("
+                                   "session TEXT, sweep_number INTEGER, file_name TEXT, timestamp TEXT, elapsed REAL, "
+                                   "frequency REAL, impedance REAL, s11 REAL, temp REAL, PRIMARY KEY (session, sweep_number))")
+                if "frequency_count" not in [row[1] for row in connection.execute("PRAGMA table_info(sessions)")]:
+                    self.migrate_frequency(connection)
+
+    @staticmethod
+    def migrate_frequency(connection):  # Catalogs from before frequency_count stored 0 for sweeps without an inflection, the summaries are rebuilt from the sweeps
+        connection.execute("ALTER TABLE sessions ADD COLUMN frequency_count INTEGER NOT NULL DEFAULT 0")
+        connection.execute("UPDATE sweeps SET frequency = NULL WHERE NOT frequency > 0")
+        connection.execute("UPDATE sessions SET "
+                           "frequency_first = (SELECT frequency FROM sweeps s WHERE s.session = sessions.session AND frequency IS NOT NULL ORDER BY sweep_number LIMIT 1), "
+                           "frequency_last = (SELECT frequency FROM sweeps s WHERE s.session = sessions.session AND frequency IS NOT NULL ORDER BY sweep_number DESC LIMIT 1), "
+                           "frequency_min = (SELECT min(frequency) FROM sweeps s WHERE s.session = sessions.session), "
+                           "frequency_max = (SELECT max(frequency) FROM sweeps s WHERE s.session = sessions.session), "
+                           "frequency_sum = (SELECT sum(frequency) FROM sweeps s WHERE s.session = sessions.session), "
+                           "frequency_count = (SELECT count(frequency) FROM sweeps s WHERE s.session = sessions.session)")
+        # Separate update, it needs the new frequency_first
+        connection.execute("UPDATE sessions SET frequency_sum_squares = "
+                           "(SELECT sum((frequency - sessions.frequency_first) * (frequency - sessions.frequency_first)) FROM sweeps s WHERE s.session = sessions.session)")
+
+    def connect(self):
+        connection = sqlite3.connect(self.database_path, timeout=10)
+        connection.execute("PRAGMA synchronous = NORMAL")  # With the write-ahead log, commits survive a crash without waiting on the disk
+        connection.create_function("sqrt", 1, lambda x: None if x is None else math.sqrt(max(x, 0.0)), deterministic=True)  # Not built into every SQLite
+        return connection
+
+    def record_sweeps(self, sweeps):  # Each sweep is a dictionary with the SWEEP_INSERT and SESSION_UPSERT fields
+        with closing(self.connect()) as connection:
+            with connection:
+                for sweep in sweeps:
+                    if sweep["frequency"] is not None and not sweep["frequency"] > 0:  # 0 or NaN means no inflection was found
+                        sweep = dict(sweep, frequency=None)
+                    if connection.execute(SWEEP_INSERT, sweep).rowcount == 1:  # Sweeps already in the catalog are not counted twice
+                        connection.execute(SESSION_UPSERT, sweep)
+
+    def record_sweep(self, session_directory, sweep_number, file_name, timestamp, elapsed, frequency, impedance, s11, temp=None):  # Called as each sweep is written
+        self.record_sweeps([{"session": path.basename(path.normpath(session_directory)), "directory": session_directory,
+                             "sweep_number": sweep_number, "file_name": file_name, "timestamp": timestamp, "elapsed": elapsed,
+                             "frequency": frequency, "impedance": impedance, "s11": s11, "temp": temp}])
+
+    def sweep_count(self, session):
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT sweep_count FROM sessions WHERE session = ?", (session,)).fetchone()
+        return 0 if row is None else row[0]
+
+    def index_session(self, session_directory):  # Adds the sweeps of a session folder that are not yet in the catalog
+        session = path.basename(path.normpath(session_directory))
+        log_path = path.join(session_directory, "0_data_log.txt")
+        if not path.exists(log_path):
+            return 0
+
+        # Sweep files are named N_S_parameters_<date>.txt, sweep N matches row N of the data log
+        sweep_files = {}
+        for file_name in listdir(session_directory):
+            number = file_name.split("_", 1)[0]
+            if number.isdigit() and int(number) > 0:
+                sweep_files[int(number)] = file_name
+
+        with open(log_path) as f:
+            header = f.readline().strip().split(",")
+            rows = [line.strip().split(",") for line in f if line.strip() != ""]
+        already_indexed = self.sweep_count(session)
+        columns = {name: header.index(name) for name in header}
+
+        sweeps = []
+        for sweep_number, row in enumerate(rows[already_indexed:], start=already_indexed + 1):
+            file_name = sweep_files.get(sweep_number)
+            sweeps.append({"session": session, "directory": session_directory, "sweep_number": sweep_number, "file_name": file_name,
+                           "timestamp": self.file_timestamp(file_name), "elapsed": float(row[columns['Elapsed Times [s]']]),
+                           "frequency": float(row[columns['Inflection Frequency [Hz]']]), "impedance": float(row[columns['Inflection Impedance [RE ohm]']]),
+                           "s11": float(row[columns['S11 at Inflection Frequency [dB]']]), "temp": self.file_temperature(session_directory, file_name)})
+        self.record_sweeps(sweeps)
+        return len(sweeps)
+
+    def index_all(self, measurement_data_directory):
+        added = 0
+        for folder in sorted(listdir(measurement_data_directory)):
+            if path.isdir(path.join(measurement_data_directory, folder)):
+                added += self.index_session(path.join(measurement_data_directory, folder))
+        return added
+
+    @staticmethod
+    def file_timestamp(file_name):  # Time the sweep was taken, from its file name
+        try:
+            return datetime.strptime(file_name.split("_S_parameters_", 1)[1][:-4], '%m-%d-%Y_%H-%M-%S').isoformat()
+        except (AttributeError, IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def file_temperature(session_directory, file_name):  # VNA temperature from the first data row of the sweep file
+        if file_name is None:
+            return None
+        try:
+            with open(path.join(session_directory, file_name)) as f:
+                header = f.readline().strip().split(",")
+                first_row = f.readline().strip().split(",")
+            return float(first_row[header.index('VNA Temp [F]')])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def query(self, sql, parameters=()):
+        with closing(self.connect()) as connection:
+            cursor = connection.execute(sql, parameters)
+            names = [d[0] for d in cursor.description] if cursor.description else []
+            return names, cursor.fetchall()
+
+
+def print_rows(names, rows):
+    print("\t".join(names))
+    for row in rows:
+        print("\t".join("" if x is None else (f"{x:.6g}" if isinstance(x, float) else str(x)) for x in row))
+
+
+def main():  # Command line queries of the catalog
+    parser = argparse.ArgumentParser(description="Queries the catalog of measurement sessions")
+    parser.add_argument("--catalog", default=CATALOG_PATH, help="Path of the catalog database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan = commands.add_parser("scan", help="Adds sweeps not yet in the catalog from every session folder")
+    scan.add_argument("--data", default=getcwd() + "\\Measurement_Data", help="Folder holding the session folders")
+    commands.add_parser("sessions", help="Lists every session with its summary values")
+    drift = commands.add_parser("drift", help="Sessions where the inflection frequency moved more than a number of MHz")
+    drift.add_argument("--min-mhz", type=float, required=True)
+    drift.add_argument("--from-start", action="store_true", help="Uses last minus first sweep instead of max minus min")
+    sweeps = commands.add_parser("sweeps", help="Lists the sweeps of one session")
+    sweeps.add_argument("session")
+    sql = commands.add_parser("sql", help="Runs any SQL query on the sessions and sweeps tables")
+    sql.add_argument("query")
+    args = parser.parse_args()
+
+    catalog = SessionCatalog(args.catalog)
+    start_time = time.perf_counter()
+    if args.command == "scan":
+        print(f"Added {catalog.index_all(args.data)} sweeps")
+    elif args.command == "sessions":
+        print_rows(*catalog.query(SESSION_SUMMARY + " ORDER BY start_time"))
+    elif args.command == "drift":
+        drift_column = "abs(frequency_last - frequency_first)" if args.from_start else "(frequency_max - frequency_min)"
+        print_rows(*catalog.query(SESSION_SUMMARY + f" WHERE {drift_column} > ? ORDER BY start_time", (args.min_mhz * 1e6,)))
+    elif args.command == "sweeps":
+        print_rows(*catalog.query("SELECT * FROM sweeps WHERE session = ? ORDER BY sweep_number", (args.session,)))
+    elif args.command == "sql":
+        print_rows(*catalog.query(args.query))
+    print(f"({(time.perf_counter() - start_time) * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
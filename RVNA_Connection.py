@@ -0,0 +1,12 @@
+# Connection to the RVNA application, kept free of Qt so command line tools can use it
+
+RVNA_RESOURCE = 'TCPIPO::127.0.0.1::5025::SOCKET'  # SCPI socket of the RVNA application
+
+
+def open_rvna():  # Opens a new SCPI connection to the RVNA application
+    import pyvisa
+    rm = pyvisa.ResourceManager('@py')  # use pyvisa-py as backend
+    instrument = rm.open_resource(RVNA_RESOURCE)
+    instrument.read_termination = '\n'  # The VNA ends each line with this. Reads will time out without this
+    instrument.timeout = 10000  # Set longer timeout period for slower sweeps
+    return instrument
@@ -0,0 +1,156 @@
+# Imports from python packages
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import path, listdir, mkdir, replace
+import argparse
+import json
+import sys
+import time
+
+from RVNA_Features import session_sweep_files
+from RVNA_SweepWriter import SWEEP_FILE_COLUMNS
+
+OUTPUT_FOLDER = "converted"  # Created inside each session folder
+TOUCHSTONE_FOLDER = "touchstone"
+PARQUET_FOLDER = "sweeps"  # Parquet dataset of every sweep, one part file per chunk
+MANIFEST_NAME = "manifest.json"
+TOUCHSTONE_HEADER = "# HZ S DB R 50"  # Frequency in Hz, S-parameters as dB and angle, 50 ohm reference
+TIME_COLUMNS = ['Current Hour', 'Current Minute', 'Current Second']  # Whole numbers in the sweep files, every other column is a float
+
+
+def import_pyarrow():  # pyarrow is only needed for the conversion, it is not part of the application build
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("RVNA_Convert needs pyarrow, install it with: pip install pyarrow")
+    return pyarrow
+
+
+def read_options(pa, column_names, integer_columns=()):  # Fixed column types, a column left empty in one file would otherwise be read as null
+    # Tables with different inferred types can not be concatenated
+    column_types = {name: pa.int64() if name in integer_columns else pa.float64() for name in column_names}
+    return pa.csv.ConvertOptions(column_types=column_types)
+
+
+def write_touchstone(file_path, source_name, frequency, s11, phase):
+    with open(file_path + ".tmp", "w", newline="") as f:
+        f.write(f"! Converted from {source_name}\n")
+        f.write(TOUCHSTONE_HEADER + "\n")
+        f.writelines(f"{x!r} {y!r} {z!r}\n" for x, y, z in zip(frequency, s11, phase))
+    replace(file_path + ".tmp", file_path)  # Only complete files get their final name
+
+
+def touchstone_rows(file_path):  # Number of data lines, comments and the option line are not counted
+    with open(file_path) as f:
+        return sum(1 for line in f if line.strip() != "" and line[0] not in "!#")
+
+
+def convert_chunk(session_directory, part_name, file_names):  # Runs in a worker process, converts one group of sweep files
+    pa = import_pyarrow()
+    output_directory = path.join(session_directory, OUTPUT_FOLDER)
+    tables = []
+    for file_name in file_names:
+        table = pa.csv.read_csv(path.join(session_directory, file_name), convert_options=read_options(pa, SWEEP_FILE_COLUMNS, TIME_COLUMNS))
+        sweep_number = int(file_name.split("_", 1)[0])
+        touchstone_path = path.join(output_directory, TOUCHSTONE_FOLDER, path.splitext(file_name)[0] + ".s1p")
+        write_touchstone(touchstone_path, file_name, table.column("Frequency [Hz]").to_pylist(), table.column("S11 [dB]").to_pylist(),
+                         table.column("S11 Phase [DEG]").to_pylist())
+        if touchstone_rows(touchstone_path) != table.num_rows:
+            raise ValueError(f"{touchstone_path} does not have the {table.num_rows} rows of {file_name}")
+        tables.append(table.add_column(0, "Sweep", pa.array([sweep_number] * table.num_rows, pa.int32())))
+
+    # One Parquet part file per chunk, the repeated per-sweep columns compress to almost nothing
+    part = pa.concat_tables(tables)
+    part_path = path.join(output_directory, PARQUET_FOLDER, part_name)
+    pa.parquet.write_table(part, part_path + ".tmp", compression="zstd")
+    rows = pa.parquet.read_metadata(part_path + ".tmp").num_rows
+    if rows != part.num_rows:
+        raise ValueError(f"{part_name} has {rows} rows, expected {part.num_rows}")
+    replace(part_path + ".tmp", part_path)
+    return part_name, file_names, rows
+
+
+def convert_data_log(session_directory):  # Data log as its own table, returns its number of rows
+    pa = import_pyarrow()
+    log_path = path.join(session_directory, "0_data_log.txt")
+    with open(log_path) as f:
+        header = f.readline().strip().split(",")
+        expected_rows = sum(1 for line in f if line.strip() != "")  # Header line is not a row
+    table = pa.csv.read_csv(log_path, convert_options=read_options(pa, header))  # Every data log column is written as a float
+    output_path = path.join(session_directory, OUTPUT_FOLDER, "data_log.parquet")  # Kept out of the sweep dataset, it has other columns
+    pa.parquet.write_table(table, output_path + ".tmp", compression="zstd")
+    rows = pa.parquet.read_metadata(output_path + ".tmp").num_rows
+    if rows != expected_rows:
+        raise ValueError(f"data_log.parquet has {rows} rows, the data log has {expected_rows}")
+    replace(output_path + ".tmp", output_path)
+    return rows
+
+
+def read_manifest(manifest_path):
+    if not path.exists(manifest_path):
+        return {"parts": {}, "data_log": None}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest_path, manifest):
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    replace(manifest_path + ".tmp", manifest_path)
+
+
+def convert_session(session_directory, processes=None, chunk_size=256):
+    # Chunks always hold the same files for a session, so chunks finished by an earlier run are recognised and skipped
+    import_pyarrow()
+    output_directory = path.join(session_directory, OUTPUT_FOLDER)
+    for folder in (output_directory, path.join(output_directory, TOUCHSTONE_FOLDER), path.join(output_directory, PARQUET_FOLDER)):
+        if not path.exists(folder):
+            mkdir(folder)
+    manifest_path = path.join(output_directory, MANIFEST_NAME)
+    manifest = read_manifest(manifest_path)
+
+    files = session_sweep_files(session_directory)
+    chunks = {f"part-{i // chunk_size:05d}.parquet": files[i:i + chunk_size] for i in range(0, len(files), chunk_size)}
+    pending = {name: chunk for name, chunk in chunks.items()
+               if manifest["parts"].get(name, {}).get("files") != chunk or not path.exists(path.join(output_directory, PARQUET_FOLDER, name))}
+
+    if len(pending) > 0:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(convert_chunk, session_directory, name, chunk) for name, chunk in pending.items()]
+            for future in as_completed(futures):
+                part_name, file_names, rows = future.result()
+                manifest["parts"][part_name] = {"files": file_names, "rows": rows}
+                write_manifest(manifest_path, manifest)  # Saved after every chunk so an interrupted run can resume
+
+    log_path = path.join(session_directory, "0_data_log.txt")
+    if path.exists(log_path):
+        log_stat = [path.getsize(log_path), path.getmtime(log_path)]
+        if manifest["data_log"] is None or manifest["data_log"]["log_stat"] != log_stat:
+            manifest["data_log"] = {"log_stat": log_stat, "rows": convert_data_log(session_directory)}
+            write_manifest(manifest_path, manifest)
+    return len(files), len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts recorded sessions to Touchstone .s1p files and a Parquet dataset")
+    parser.add_argument("sessions", nargs="+", help="Session folders, or Measurement_Data to convert every session in it")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Sweeps per Parquet part file")
+    args = parser.parse_args()
+
+    session_directories = []
+    for directory in args.sessions:
+        if path.exists(path.join(directory, "0_data_log.txt")) or len(session_sweep_files(directory)) > 0:
+            session_directories.append(directory)
+        else:  # Folder of sessions
+            session_directories += [path.join(directory, f) for f in sorted(listdir(directory)) if path.isdir(path.join(directory, f))]
+
+    for session_directory in session_directories:
+        start_time = time.perf_counter()
+        number_of_sweeps, converted_chunks = convert_session(session_directory, args.processes, args.chunk_size)
+        print(f"{session_directory}: {number_of_sweeps} sweeps, {converted_chunks} chunks converted in {time.perf_counter() - start_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
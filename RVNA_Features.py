@@ -0,0 +1,151 @@
+# Imports from python packages
+from concurrent.futures import ProcessPoolExecutor
+from os import path, listdir
+import argparse
+import csv
+import time
+import numpy as np
+
+# Columns read from each s-parameter file
+SWEEP_COLUMNS = ['Frequency [Hz]', 'S11 [dB]', 'S11 Phase [DEG]', 'Zin [RE ohm]', 'Zin [IM ohm]']
+
+# Features computed for every sweep, in the order they are written
+FEATURE_NAMES = ['Inflection Frequency [Hz]', 'Inflection Impedance [RE ohm]', 'S11 at Inflection Frequency [dB]',
+                 'Resonance Count', 'Resonance Frequency [Hz]', 'S11 at Resonance [dB]', 'Bandwidth [Hz]', 'Q Factor',
+                 'Phase Slope [DEG/MHz]', 'Zin at Resonance [RE ohm]', 'Zin at Resonance [IM ohm]']
+
+
+def rolling_mean(values, window):  # Rolling average along each sweep, the first window - 1 points are NaN like pandas
+    window = int(window)
+    result = np.full(values.shape, np.nan)
+    if window <= values.shape[1]:
+        result[:, window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window, axis=1).mean(axis=2)
+    return result
+
+
+def inflection_points(frequency, s11, real_impedance, imaginary_impedance, smoothing):
+    # Same definition as the measurement thread: of the points where the smoothed imaginary impedance is closest to zero,
+    # the one with the lowest S11 below 0 dB is the inflection point. Sweeps without one return zeros.
+    smoothed = np.abs(rolling_mean(imaginary_impedance, smoothing))
+    candidates = np.zeros(s11.shape, dtype=bool)
+    candidates[:, 1:-1] = (smoothed[:, :-2] > smoothed[:, 1:-1]) & (smoothed[:, 2:] > smoothed[:, 1:-1]) & (s11[:, 1:-1] < 0.0)
+
+    candidate_s11 = np.where(candidates, s11, np.inf)
+    index = np.argmin(candidate_s11, axis=1)  # First point with the lowest S11
+    found = candidates.any(axis=1)
+    rows = np.arange(len(s11))
+    inflection_frequency = np.where(found, np.broadcast_to(frequency, s11.shape)[rows, index], 0.0)
+    inflection_impedance = np.where(found, real_impedance[rows, index], 0.0)
+    s11_at_inflection = np.where(found, s11[rows, index], 0.0)
+    return inflection_frequency, inflection_impedance, s11_at_inflection
+
+
+def resonance_mask(s11, level_db=-10.0):  # Every local S11 minimum below level_db
+    mask = np.zeros(s11.shape, dtype=bool)
+    mask[:, 1:-1] = (s11[:, 1:-1] < s11[:, :-2]) & (s11[:, 1:-1] <= s11[:, 2:]) & (s11[:, 1:-1] < level_db)
+    return mask
+
+
+def edge_frequency(frequency, s11, inside, outside, level_db):  # Linear interpolation of where S11 crosses level_db
+    f_in, f_out = frequency[inside], frequency[outside]
+    s_in, s_out = s11[inside], s11[outside]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.where(s_out != s_in, (level_db - s_in) / (s_out - s_in), 0.0)
+    return f_in + fraction * (f_out - f_in)
+
+
+def extract_features(frequency, s11, phase, real_impedance, imaginary_impedance, smoothing=15, level_db=-10.0):
+    # All arrays are [sweep, point] except frequency, which may be one row shared by every sweep
+    s11 = np.atleast_2d(np.asarray(s11, dtype=float))
+    phase = np.atleast_2d(np.asarray(phase, dtype=float))
+    real_impedance = np.atleast_2d(np.asarray(real_impedance, dtype=float))
+    imaginary_impedance = np.atleast_2d(np.asarray(imaginary_impedance, dtype=float))
+    frequency = np.broadcast_to(np.asarray(frequency, dtype=float), s11.shape)
+    number_of_sweeps, number_of_points = s11.shape
+    rows = np.arange(number_of_sweeps)
+    points = np.arange(number_of_points)
+
+    features = dict(zip(FEATURE_NAMES[:3], inflection_points(frequency, s11, real_impedance, imaginary_impedance, smoothing)))
+    features['Resonance Count'] = resonance_mask(s11, level_db).sum(axis=1)
+
+    # Deepest resonance of each sweep
+    resonance = np.argmin(s11, axis=1)
+    resonance_s11 = s11[rows, resonance]
+    resonance_frequency = frequency[rows, resonance]
+    features['Resonance Frequency [Hz]'] = resonance_frequency
+    features['S11 at Resonance [dB]'] = resonance_s11
+
+    # Bandwidth: the band around the deepest resonance that stays below level_db
+    above = s11 >= level_db
+    lower_outside = np.where(above & (points < resonance[:, None]), points, -1).max(axis=1)
+    upper_outside = np.where(above & (points > resonance[:, None]), points, number_of_points).min(axis=1)
+    lower_clipped = np.clip(lower_outside, 0, number_of_points - 1)
+    upper_clipped = np.clip(upper_outside, 0, number_of_points - 1)
+    lower_edge = np.where(lower_outside >= 0, edge_frequency(frequency, s11, (rows, lower_clipped + 1), (rows, lower_clipped), level_db), frequency[:, 0])
+    upper_edge = np.where(upper_outside < number_of_points, edge_frequency(frequency, s11, (rows, upper_clipped - 1), (rows, upper_clipped), level_db), frequency[:, -1])
+    bandwidth = np.where(resonance_s11 < level_db, upper_edge - lower_edge, np.nan)
+    features['Bandwidth [Hz]'] = bandwidth
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features['Q Factor'] = resonance_frequency / bandwidth
+
+    # Phase slope at the resonance, phase is unwrapped so the +-180 degree jumps do not count
+    phase_slope = np.gradient(np.unwrap(phase, period=360, axis=1), axis=1) / np.gradient(frequency, axis=1)
+    features['Phase Slope [DEG/MHz]'] = phase_slope[rows, resonance] * 1e6
+
+    features['Zin at Resonance [RE ohm]'] = real_impedance[rows, resonance]
+    features['Zin at Resonance [IM ohm]'] = imaginary_impedance[rows, resonance]
+    return features
+
+
+def read_sweep_file(file_path):  # Frequency, S11, phase, real and imaginary Zin of one s-parameter file
+    with open(file_path) as f:
+        header = f.readline().strip().split(",")
+    data = np.loadtxt(file_path, delimiter=",", skiprows=1, usecols=[header.index(name) for name in SWEEP_COLUMNS], ndmin=2)
+    return data.T
+
+
+def extract_files(file_paths, smoothing=15, level_db=-10.0):  # Loads a group of sweeps into stacked arrays and extracts them together
+    sweeps = np.stack([read_sweep_file(file_path) for file_path in file_paths])  # [sweep, column, point]
+    return extract_features(sweeps[:, 0], sweeps[:, 1], sweeps[:, 2], sweeps[:, 3], sweeps[:, 4], smoothing, level_db)
+
+
+def session_sweep_files(session_directory):  # Sweep files in the order they were measured
+    files = [f for f in listdir(session_directory) if f.split("_", 1)[0].isdigit() and int(f.split("_", 1)[0]) > 0]
+    files.sort(key=lambda f: int(f.split("_", 1)[0]))
+    return files
+
+
+def extract_session(session_directory, processes=None, chunk_size=128, smoothing=15, level_db=-10.0):
+    # Sweeps are split in chunks, each chunk is loaded and extracted by one worker process
+    files = session_sweep_files(session_directory)
+    chunks = [[path.join(session_directory, f) for f in files[i:i + chunk_size]] for i in range(0, len(files), chunk_size)]
+    features = {name: [] for name in FEATURE_NAMES}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for chunk_features in pool.map(extract_files, chunks, [smoothing] * len(chunks), [level_db] * len(chunks)):
+            for name in FEATURE_NAMES:
+                features[name].append(chunk_features[name])
+    return files, {name: np.concatenate(values) if len(values) > 0 else np.empty(0) for name, values in features.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extracts resonance features from every sweep of recorded sessions")
+    parser.add_argument("sessions", nargs="+", help="Session folders under Measurement_Data")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument("--smoothing", type=int, default=15, help="Imaginary impedance smoothing window used for the inflection point")
+    parser.add_argument("--level", type=float, default=-10.0, help="S11 level in dB used for resonances and bandwidth")
+    args = parser.parse_args()
+
+    for session_directory in args.sessions:
+        start_time = time.perf_counter()
+        files, features = extract_session(session_directory, args.processes, smoothing=args.smoothing, level_db=args.level)
+        output_path = path.join(session_directory, "0_features.csv")
+        with open(output_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["File"] + FEATURE_NAMES)
+            for i, file_name in enumerate(files):
+                writer.writerow([file_name] + [features[name][i].item() for name in FEATURE_NAMES])
+        print(f"{session_directory}: {len(files)} sweeps in {time.perf_counter() - start_time:.2f} s, written to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
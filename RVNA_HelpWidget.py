@@ -0,0 +1,17 @@
+# Imports from python packages
+from PySide6.QtGui import QIcon
+from PySide6.QtPdf import QPdfDocument
+from PySide6.QtPdfWidgets import QPdfView
+
+
+class HelpWidget(QPdfView):
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Help Document")  # Set Window Title
+        self.setWindowIcon(QIcon("Resources\\HelpIcon.png"))
+        self.resize(850, 500)
+        self.help_pdf = QPdfDocument()
+        self.help_pdf.load("Resources\\GlucoseMeasuringHelp.pdf")  # Loads path of help document
+        self.setPageMode(QPdfView.PageMode.MultiPage)
+        self.setDocument(self.help_pdf)
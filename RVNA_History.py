@@ -0,0 +1,99 @@
+# Imports from python packages
+import numpy as np
+
+# Columns of the data log, in the order they are written
+LOG_COLUMNS = ['Current Hour', 'Current Minute', 'Current Second', 'Elapsed Times [s]', 'Inflection Frequency [Hz]', 'Inflection Impedance [RE ohm]', 'S11 at Inflection Frequency [dB]']
+ELAPSED_TIME_COLUMN = 3  # Column used to order the tiers in time
+
+
+class RingBuffer:    # Fixed-capacity table of rows, the oldest row is overwritten once it is full
+
+    def __init__(self, capacity, number_of_columns):
+        self.data = np.full((capacity, number_of_columns), np.nan)  # Preallocated once
+        self.capacity = capacity
+        self.count = 0  # Total number of rows ever appended
+
+    def append(self, row):
+        self.data[self.count % self.capacity] = row
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def rows(self):  # Rows currently held, oldest first
+        if self.count <= self.capacity:
+            return self.data[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self.data[start:], self.data[:start]))
+
+    def last(self):
+        return self.data[(self.count - 1) % self.capacity]
+
+
+class SweepHistory:    # Bounded-memory history of a measurement session
+    # Tier 0 holds the most recent rows as measured. Every higher tier holds the average of tier_factor rows of the tier
+    # below it, so each tier covers tier_factor times more of the session at the same memory cost.
+
+    def __init__(self, capacity=2048, tier_factor=8, number_of_tiers=5, trace_capacity=8, columns=LOG_COLUMNS):
+        self.columns = list(columns)
+        self.tier_factor = tier_factor
+        self.tiers = [RingBuffer(capacity, len(self.columns)) for _ in range(number_of_tiers)]
+        self.block_sums = np.zeros((number_of_tiers, len(self.columns)))  # Running sums of the block being averaged for each tier
+        self.block_counts = [0] * number_of_tiers
+
+        # Most recent sweeps, allocated when the first sweep shows the number of points
+        self.trace_capacity = trace_capacity
+        self.frequency = None
+        self.traces = None  # [sweep, quantity, point], quantity order is S11, phase, real Zin, imaginary Zin
+        self.trace_count = 0
+
+    def append(self, row):  # Adds one data log row, constant cost at any session length
+        row = np.asarray(row, dtype=float)
+        self.tiers[0].append(row)
+        for tier in range(1, len(self.tiers)):
+            self.block_sums[tier] += row
+            self.block_counts[tier] += 1
+            if self.block_counts[tier] < self.tier_factor:
+                break
+            row = self.block_sums[tier] / self.tier_factor  # Block is complete, its average moves up a tier
+            self.tiers[tier].append(row)
+            self.block_sums[tier] = 0
+            self.block_counts[tier] = 0
+
+    def __len__(self):  # Number of rows appended this session
+        return self.tiers[0].count
+
+    def latest(self):  # Most recent row as a dictionary of column name to value
+        return dict(zip(self.columns, self.tiers[0].last()))
+
+    def trend(self):  # Whole session, coarse for old data and finer towards the present, oldest first
+        pieces = []
+        covered_from = np.inf  # Elapsed time of the oldest row already taken from a finer tier
+        for tier in self.tiers:
+            rows = tier.rows()
+            if len(rows) == 0:
+                continue
+            pieces.append(rows[rows[:, ELAPSED_TIME_COLUMN] < covered_from])
+            covered_from = min(covered_from, rows[0, ELAPSED_TIME_COLUMN])
+        if len(pieces) == 0:
+            return np.empty((0, len(self.columns)))
+        return np.concatenate(pieces[::-1])
+
+    def column(self, rows, name):
+        return rows[:, self.columns.index(name)]
+
+    def add_trace(self, frequency, s11, phase, real_impedance, imaginary_impedance):
+        if self.traces is None or len(frequency) != len(self.frequency):
+            self.frequency = np.array(frequency, dtype=float)
+            self.traces = np.full((self.trace_capacity, 4, len(frequency)), np.nan)
+            self.trace_count = 0
+        slot = self.traces[self.trace_count % self.trace_capacity]
+        slot[0] = s11
+        slot[1] = phase
+        slot[2] = real_impedance
+        slot[3] = imaginary_impedance
+        self.trace_count += 1
+
+    def latest_trace(self):  # Frequency, S11, phase, real and imaginary Zin of the most recent sweep
+        slot = self.traces[(self.trace_count - 1) % self.trace_capacity]
+        return self.frequency, slot[0], slot[1], slot[2], slot[3]
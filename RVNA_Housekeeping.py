@@ -0,0 +1,65 @@
+# Housekeeping telemetry of the RVNA, read on its own slower schedule so the sweeps never wait for it
+
+# Imports from python packages
+import threading
+import time
+
+TEMPERATURE_QUERY = "SYST:TEMP:SENS1?"  # Temperature of the instrument in C
+STATUS_QUERIES = {'Operation Status': "STAT:OPER:COND?", 'Questionable Status': "STAT:QUES:COND?"}  # Status condition registers
+HOUSEKEEPING_INTERVAL = 60  # Seconds between readings
+
+# Columns added to the data log for each sweep, in the order they are written
+HOUSEKEEPING_COLUMNS = ['VNA Temp [F]', 'VNA Temp Age [s]', 'Operation Status', 'Questionable Status']
+
+
+class HousekeepingCache:    # Latest housekeeping values with the time they were read, shared by the housekeeping and measurement threads
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}  # name: (value, time read)
+
+    def update(self, name, value):
+        with self.lock:
+            self.values[name] = (value, time.time())
+
+    def value(self, name):  # Latest value, NaN if it was never read
+        with self.lock:
+            return self.values.get(name, (float("nan"), None))[0]
+
+    def row(self):  # Values of HOUSEKEEPING_COLUMNS for a sweep taken now
+        with self.lock:
+            temperature, read_time = self.values.get('VNA Temp [F]', (float("nan"), None))
+            age = float("nan") if read_time is None else time.time() - read_time
+            return [temperature, age] + [self.values.get(name, (float("nan"), None))[0] for name in STATUS_QUERIES]
+
+
+class HousekeepingThread(threading.Thread):    # Reads the instrument temperature and status every HOUSEKEEPING_INTERVAL seconds
+    # A plain thread, it runs in the acquisition process which has no Qt application
+
+    def __init__(self, instrument, instrument_lock, cache, interval=HOUSEKEEPING_INTERVAL):
+        super().__init__(daemon=True)
+        self.instrument = instrument
+        self.instrument_lock = instrument_lock  # Held by the measurement for a whole sweep, so readings only happen between sweeps
+        self.cache = cache
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.poll()
+            self.stop_event.wait(self.interval)
+
+    def poll(self):  # One reading of every value, a failed query leaves the previous value in the cache
+        with self.instrument_lock:
+            try:
+                self.cache.update('VNA Temp [F]', (float(self.instrument.query(TEMPERATURE_QUERY)) * (9 / 5)) + 32)
+            except Exception:
+                pass
+            for name, query in STATUS_QUERIES.items():
+                try:
+                    self.cache.update(name, float(int(self.instrument.query(query))))
+                except Exception:
+                    pass
+
+    def stop(self):
+        self.stop_event.set()
@@ -2,28 +2,33 @@
 
 from PySide6.QtWidgets import QMainWindow, QPushButton, QStatusBar, QWidget, QTextEdit, QFrame, QVBoxLayout, QHBoxLayout, QFormLayout, QDialog, QFileDialog, QMessageBox, QLineEdit, QLabel
 from PySide6.QtGui import QIcon, QPainter, QFont
-from PySide6.QtCore import Signal, QThread, QTimer, QPointF, Qt
+from PySide6.QtCore import Signal, QThread, QTimer, QPointF, Qt, QFileSystemWatcher
 from PySide6.QtCharts import QChart, QChartView, QLineSeries, QScatterSeries, QValueAxis
-from PySide6.QtPdf import QPdfDocument
-from PySide6.QtPdfWidgets import QPdfView
 from datetime import datetime
-from numpy import row_stack
-from paramiko import SSHClient, AutoAddPolicy
-from scp import SCPClient
-from os import path, listdir, getcwd, mkdir
-import pyvisa
-import pandas as pd
+from os import path, listdir, getcwd, mkdir, linesep
+import sqlite3
 import time
 
+# pandas, numpy, pyvisa, paramiko and QtPdf are slow to import, so they are imported where they are first used
+
 # Imports key information from other python file
 import User_Pass_Key
+from RVNA_Catalog import SessionCatalog
+from RVNA_CalState import cal_fingerprint, instrument_matches_setup, TRACE_SETUP_COMMANDS
+from RVNA_TrendStats import rolling_mean_column
+from RVNA_Housekeeping import HOUSEKEEPING_COLUMNS
+from RVNA_Connection import RVNA_RESOURCE
+from RVNA_UploadOutbox import UploadOutbox, BandwidthLimiter, PRIORITY_S_PARAMETERS, METHOD_APPEND
+
+ACQUISITION_STOP_TIMEOUT = 60  # Seconds a running acquisition process is given to finish its sweep before a new measurement is refused
 
 
 class RVNAMainWindow(QMainWindow):
 
-    def __init__(self, app):    # Main Window Constructor
+    def __init__(self, app, rvna_process=None):    # Main Window Constructor
         super().__init__()
         self.app = app
+        self.rvna_process = rvna_process  # RVNA.exe started by RVNA_App, the calibration state it holds only lasts as long as it runs
         self.setWindowTitle("RVNA Reading Application")  # Set Window Title
         self.setWindowIcon(QIcon("Resources\\SmithChartIcon.png"))  # Set Window Icon
 
@@ -33,6 +38,8 @@ class RVNAMainWindow(QMainWindow):
         self.local_meas_dir = None
         self.measurement_file_directory = ""
         self.rvna_is_connected = 0
+        self.cal_state_fingerprint = None  # Fingerprint of the calibration state loaded into RVNA.exe
+        self.cal_state_instance = None  # RVNA.exe instance the fingerprint was loaded into
         self.smoothing = 15  # Default measured imaginary impedance smoothing
         self.time_elapsed_min = 0
         self.time_elapsed_max = 30
@@ -96,6 +103,10 @@ class RVNAMainWindow(QMainWindow):
         self.s11_graph.legend().hide()
         self.s11_graph.addAxis(self.frequency_axis, Qt.AlignmentFlag.AlignBottom)
         self.s11_graph.addAxis(self.s11_mag_axis, Qt.AlignmentFlag.AlignLeft)
+        # Series are added once, graphing only replaces their points (removing and re-adding them every sweep leaks memory)
+        self.s11_graph.addSeries(self.s11_series)  # Adds series to graph
+        self.s11_series.attachAxis(self.frequency_axis)  # Attaches both axis to the series
+        self.s11_series.attachAxis(self.s11_mag_axis)
         self.s11_graph_view = QChartView(self.s11_graph)
         self.s11_graph_view.setRenderHint(QPainter.RenderHint.Antialiasing)
 
@@ -137,6 +148,12 @@ class RVNAMainWindow(QMainWindow):
         self.frequency_graph.addAxis(self.time_elapsed_axis, Qt.AlignmentFlag.AlignBottom)
         self.frequency_graph.addAxis(self.inflection_frequency_axis, Qt.AlignmentFlag.AlignLeft)
         self.frequency_graph.addAxis(self.s11_min_axis, Qt.AlignmentFlag.AlignRight)
+        self.frequency_graph.addSeries(self.inflection_frequency_series)  # Adds series to graph
+        self.frequency_graph.addSeries(self.s11_min_series)
+        self.inflection_frequency_series.attachAxis(self.inflection_frequency_axis)  # Attaches both axis to the inflection frequency series
+        self.inflection_frequency_series.attachAxis(self.time_elapsed_axis)
+        self.s11_min_series.attachAxis(self.s11_min_axis)  # Attaches both axis to the minimum S11 series
+        self.s11_min_series.attachAxis(self.time_elapsed_axis)
         self.frequency_graph_view = QChartView(self.frequency_graph)
         self.frequency_graph_view.setRenderHint(QPainter.RenderHint.Antialiasing)
 
@@ -197,32 +214,33 @@ class RVNAMainWindow(QMainWindow):
         main_widget.setLayout(central_widget_layout)  # Sets the frame in the main widget
         # =========================================================================================
 
-        # Timer Initialization for Measurement Thread =============================================
-        # Initializing the Thread used to Start the Measurements
-        self.measurement = MeasurementThread(self.smoothing)
-        self.measurement.measurement_update.connect(self.measurement_update_event)
-        self.measurement.measurements_filedirectory.connect(self.get_measurement_file)
-        self.measurement.finished.connect(self.graphing)  # graph function runs everytime
-
-        # Timer Initialized to Start Measurement Thread
-        self.measurement_timer = QTimer()
-        self.measurement_timer.timeout.connect(self.run_measurement)
-        self.measurement_timer.setInterval(int(self.time_inbetween_measurements) * 1000)
+        # Acquisition Process and Sweep Ring =====================================================
+        # Sweeps are taken by a separate process (RVNA_Acquisition) that writes them to a shared-memory ring,
+        # the GUI reads new sweeps from the ring by sequence number so drawing and uploads never delay a sweep
+        self.acquisition = None
+        self.acquisition_commands = None  # Queue used to send setting changes to the acquisition process
+        self.sweep_ring = None
+        self.last_frame = 0  # Sequence number of the last sweep read from the ring
+        self.history = None  # GUI copy of the session history used for the graphs, filled from the ring
+        self.latest_features = None  # Resonance features of the most recent sweep
+
+        # Timer Initialized to read new sweeps from the ring
+        self.sweep_ring_timer = QTimer()
+        self.sweep_ring_timer.timeout.connect(self.read_sweep_ring)
+        self.sweep_ring_timer.setInterval(250)
         # =========================================================================================
 
-        # Initializing Timer and File Transfer Thread =============================================
-        self.data_log_transfer = ServerTransferThread("data_log")
-        self.s_parameter_transfer = ServerTransferThread("s_parameters")
-
-        self.data_log_transfer_timer = QTimer()
-        self.data_log_transfer_timer.timeout.connect(self.data_file_transfer)
-        self.data_log_transfer_timer.setInterval(3000)  # Every 3 seconds, the program will attempt to connect to the server, transfer files, then close the connection
-        self.data_log_transfer_timer.start()
-
-        self.s_parameters_transfer_timer = QTimer()
-        self.s_parameters_transfer_timer.timeout.connect(self.s_parameter_file_transfer)
-        self.s_parameters_transfer_timer.setInterval(60000)  # Every 60 seconds, the program will attempt to connect to the server, transfer files, then close the connection
-        self.s_parameters_transfer_timer.start()
+        # Initializing File Transfer Threads =====================================================
+        # Transfers are started by the measurement thread each time a sweep is written, so nothing runs while idle
+        # Each written sweep is queued once in a persistent outbox, which is sent data log first and s-parameters after
+        self.upload_transfer = ServerTransferThread()
+        if self.upload_transfer.outbox.pending_count() > 0:  # Resumes uploads left over from an earlier run
+            self.upload_transfer.request_transfer()
+
+        # Optional watcher used to also upload files added to the measurement folder by other programs, turned on in the Settings menu
+        self.watch_external_files = 0
+        self.external_file_watcher = QFileSystemWatcher()
+        self.external_file_watcher.directoryChanged.connect(self.external_files_changed)
         # =========================================================================================
 
         # Menubar =================================================================================
@@ -231,22 +249,37 @@ class RVNAMainWindow(QMainWindow):
         settings_menu = self.menu_bar.addMenu("Settings")
         # Time Change Action allows user to change the time period inbetween VNA measurements
         time_change_action = settings_menu.addAction("Time Inbetween Measurements")
-        self.time_change_window = TimeChangeWidget()
-        self.time_change_window.submit_time.connect(self.time_change)  # Connecting TimeChangeWidget signal to the Main Window slot
-        time_change_action.triggered.connect(self.time_change_window.show)
+        self.time_change_window = None  # Settings windows are only created the first time they are opened
+        time_change_action.triggered.connect(self.show_time_change_window)
         # Calibration State File Location Action allows user to change the directory that the Cal State File is located in
         cal_state_file_location_action = settings_menu.addAction("Calibration State Location")
         cal_state_file_location_action.triggered.connect(self.cal_state_location)
         # Change Smoothing Window Action allows user to change inflection impedance / frequency smoothing window during measurement
         change_smoothing_action = settings_menu.addAction("Smoothing Window")
-        self.change_smoothing_window = SmoothingChangeWidget()
-        self.change_smoothing_window.impedance_smoothing.connect(self.smoothing_change)
-        change_smoothing_action.triggered.connect(self.change_smoothing_window.show)
+        self.change_smoothing_window = None
+        change_smoothing_action.triggered.connect(self.show_change_smoothing_window)
+        # Burst Averaging Action allows user to average several fast sweeps for each measurement
+        burst_change_action = settings_menu.addAction("Burst Averaging")
+        self.burst_change_window = None
+        burst_change_action.triggered.connect(self.show_burst_change_window)
+        # Upload Bandwidth Action allows user to limit how much of the uplink the server uploads use
+        bandwidth_change_action = settings_menu.addAction("Upload Bandwidth Limit")
+        self.bandwidth_change_window = None
+        bandwidth_change_action.triggered.connect(self.show_bandwidth_change_window)
+        # Watch External Files Action also uploads sweep files other programs add to the measurement folder
+        watch_external_files_action = settings_menu.addAction("Upload Sweep Files Added by Other Programs")
+        watch_external_files_action.setCheckable(True)
+        watch_external_files_action.toggled.connect(self.watch_external_files_change)
+        # Sessions Menu (Used to look at past measurement sessions)
+        sessions_menu = self.menu_bar.addMenu("Sessions")
+        session_browser_action = sessions_menu.addAction("Session Browser")
+        self.session_browser_window = None  # Only created the first time it is opened
+        session_browser_action.triggered.connect(self.show_session_browser_window)
         # Help Menu (Used to help users)
         help_menu = self.menu_bar.addMenu("Help")
         pdf_help_action = help_menu.addAction("Help Document")
-        self.pdf_view_window = HelpWidget()
-        pdf_help_action.triggered.connect(self.pdf_view_window.show)
+        self.pdf_view_window = None  # The help document is only loaded the first time it is opened
+        pdf_help_action.triggered.connect(self.show_pdf_view_window)
         # =========================================================================================
 
         # Status Bar ==============================================================================
@@ -255,17 +288,72 @@ class RVNAMainWindow(QMainWindow):
         # Maximize Window
         self.showMaximized()  # Setting Fullscreen
 
+    def show_time_change_window(self):
+        if self.time_change_window is None:
+            self.time_change_window = TimeChangeWidget()
+            self.time_change_window.submit_time.connect(self.time_change)  # Connecting TimeChangeWidget signal to the Main Window slot
+        self.time_change_window.show()
+
+    def show_change_smoothing_window(self):
+        if self.change_smoothing_window is None:
+            self.change_smoothing_window = SmoothingChangeWidget()
+            self.change_smoothing_window.impedance_smoothing.connect(self.smoothing_change)
+        self.change_smoothing_window.show()
+
+    def show_burst_change_window(self):
+        if self.burst_change_window is None:
+            self.burst_change_window = BurstChangeWidget()
+            self.burst_change_window.submit_burst.connect(self.burst_change)
+        self.burst_change_window.show()
+
+    def show_bandwidth_change_window(self):
+        if self.bandwidth_change_window is None:
+            self.bandwidth_change_window = BandwidthChangeWidget()
+            self.bandwidth_change_window.submit_bandwidth.connect(self.bandwidth_change)
+        self.bandwidth_change_window.show()
+
+    def watch_external_files_change(self, checked):
+        self.watch_external_files = 1 if checked else 0
+        if len(self.external_file_watcher.directories()) > 0:
+            self.external_file_watcher.removePaths(self.external_file_watcher.directories())
+        if self.watch_external_files == 1 and ServerTransferThread.measurements_directory is not None:  # Measurement already running
+            self.external_file_watcher.addPath(ServerTransferThread.measurements_directory)
+            self.external_files_changed(ServerTransferThread.measurements_directory)  # Picks up files added before it was turned on
+
+    def show_session_browser_window(self):
+        if self.session_browser_window is None:
+            from RVNA_SessionBrowser import SessionBrowserWidget
+            self.session_browser_window = SessionBrowserWidget()
+        self.session_browser_window.show()
+
+    def show_pdf_view_window(self):
+        if self.pdf_view_window is None:
+            from RVNA_HelpWidget import HelpWidget  # Imports QtPdf on first use
+            self.pdf_view_window = HelpWidget()
+        self.pdf_view_window.show()
+
     def calibrate_and_start_measurement(self):
         global CMT
+        # Only one measurement sweeps the instrument at a time, a running one is stopped first
+        if not self.stop_acquisition():
+            user_alert = QMessageBox()
+            user_alert.setWindowTitle("Start Measurement Failed")
+            user_alert.setText("The Running Measurement Did Not Stop")
+            user_alert.setInformativeText("Wait for the current sweep to finish and try again")
+            user_alert.setIcon(QMessageBox.Icon.Critical)
+            user_alert.exec()
+            return
+
         # RVNA Software Connection =====================================
         if self.rvna_is_connected == 0:
+            import pyvisa
             rm = pyvisa.ResourceManager('@py')  # use pyvisa-py as backend
 
             try:
                 CMT  # Used to check if there has been an object created to connect to the RVNA
             except NameError:
                 try:
-                    CMT = rm.open_resource('TCPIPO::127.0.0.1::5025::SOCKET')  # Connects to RVNA application using SCPI
+                    CMT = rm.open_resource(RVNA_RESOURCE)  # Connects to RVNA application using SCPI
 
                     connection_message = "Connected to VNA\n"
                     #self.main_widget_textedit.append(connection_message)  # Updates Text Editor
@@ -279,23 +367,21 @@ class RVNAMainWindow(QMainWindow):
         CMT.timeout = 10000  # Set longer timeout period for slower sweeps
 
         # RVNA Calibration Process ======================================
-        CMT.write(f"MMEM:LOAD:STAT {self.cal_file_directory}")  # Recalls calibration state with specified file
-        CMT.write("DISP:WIND:SPL 2")  # Allocate 2 trace windows
-        CMT.write("CALC1:PAR:COUN 3")  # 3 Traces
-        CMT.write("CALC1:PAR1:DEF S11")  # Choose S11 for trace 1
-        CMT.write("CALC1:PAR2:DEF S11")  # Choose S11 for trace 2
-        CMT.write("CALC1:PAR3:DEF S11")  # Choose S11 for trace 3
-
-        CMT.write("CALC1:PAR1:SEL")  # Selects Trace 1 and Phase Format
-        CMT.write("CALC1:FORM PHAS")
-
-        CMT.write("CALC1:PAR2:SEL")  # Selects Trace 2 and Smith Chart Format
-        CMT.write("CALC1:FORM SMIT")
+        # The calibration state is only reloaded when the cal file or trace setup changed, or the instrument no longer holds it
+        fingerprint = cal_fingerprint(self.cal_file_directory)
+        rvna_instance = self.rvna_instance()
+        if (fingerprint is not None and fingerprint == self.cal_state_fingerprint and rvna_instance is not None and rvna_instance == self.cal_state_instance
+                and instrument_matches_setup(CMT, self.cal_file_directory)):
+            self.statusBar().showMessage("Calibration state already loaded", 10000)  # Updates Status Bar
+        else:
+            CMT.write(f"MMEM:LOAD:STAT {self.cal_file_directory}")  # Recalls calibration state with specified file
+            for setup_command in TRACE_SETUP_COMMANDS:  # Sets up the phase, smith chart and log mag traces
+                CMT.write(setup_command)
 
-        CMT.write("CALC1:PAR3:SEL")  # Selects Trace 3 and Log Mag Format
-        CMT.write("CALC1:FORM MLOG")
+            CMT.query("*OPC?")  # Wait for measurement to complete
 
-        CMT.query("*OPC?")  # Wait for measurement to complete
+            self.cal_state_fingerprint = fingerprint
+            self.cal_state_instance = rvna_instance
 
         # open calibration window
         cal_window = CalibrationDialog()
@@ -312,6 +398,7 @@ class RVNAMainWindow(QMainWindow):
         # ==========================================================================================================
 
         # Get Measurements Folder Name ======================================
+        self.local_meas_dir = None  # Each measurement gets a new folder, sweep N of a folder is always row N of its data log
         self.receive_directory()
 
         if self.local_meas_dir is None:
@@ -324,74 +411,155 @@ class RVNAMainWindow(QMainWindow):
             return
 
         MeasurementThread.measurements_directory = path.normpath(self.local_meas_dir)  # Changes MeasurementThread class variable
-        ServerTransferThread.measurements_directory = path.normpath(self.local_meas_dir)  # Changes ServerTransferThread class variable
+        ServerTransferThread.new_session(path.normpath(self.local_meas_dir))  # Changes ServerTransferThread class variables and clears the upload index
+
+        if len(self.external_file_watcher.directories()) > 0:  # Stops watching the previous session
+            self.external_file_watcher.removePaths(self.external_file_watcher.directories())
+        if self.watch_external_files == 1:
+            self.external_file_watcher.addPath(path.normpath(self.local_meas_dir))
 
         #self.main_widget_textedit.append("RVNA is calibrated\n")  # Updates Text Editor
 
-        self.measurement_timer.start()
+        self.start_acquisition()
 
         self.menu_bar.hide()
 
         self.statusBar().showMessage("RVNA calibrated", 10000)  # Updates Status Bar
 
-    def run_measurement(self):
-        self.measurement.start()
-
-    def data_file_transfer(self):
-        self.data_log_transfer.start()
-
-    def s_parameter_file_transfer(self):
-        self.s_parameter_transfer.start()
-
-    def measurement_update_event(self, meas_update):  # Takes signal from measurement Thread
-        #self.main_widget_textedit.append(meas_update)  # Updates Text Editor
-        pass
-
-    def get_measurement_file(self, file):
-        self.measurement_file_directory = MeasurementThread.measurements_directory+"\\"+file[0]
-        self.log_file_path = MeasurementThread.measurements_directory+file[1]
-
-    def graphing(self):  # Is called after measurement thread finishes
-        self.s11_series.clear()  # Clears data from series
-        self.s11_graph.removeSeries(self.s11_series)  # Removes series from graph
-        current_file_contents = pd.read_csv(self.measurement_file_directory)  # Reads measurement file as dataframe
-        frequency = current_file_contents['Frequency [Hz]'].tolist()  # Creates frequency list
-        s11_mag = current_file_contents['S11 [dB]'].tolist()  # Creates S11 magnitude list
-
-        for i in range(len(frequency)):
-            self.s11_series.append(QPointF(frequency[i] / 1e9, s11_mag[i]))  # Appends all points to series
+    def closeEvent(self, event):  # Stops the acquisition process with the window, it only keeps running if the GUI fails
+        self.send_acquisition_command("stop")
+        super().closeEvent(event)
+
+    def stop_acquisition(self):  # Stops a running acquisition process and waits for it, True once none is running
+        if self.acquisition is None or not self.acquisition.is_alive():
+            return True
+        self.send_acquisition_command("stop")
+        self.acquisition.join(ACQUISITION_STOP_TIMEOUT)  # It finishes the sweep it is taking first
+        if self.acquisition.is_alive():
+            return False
+        self.read_sweep_ring()  # Takes in the sweeps it wrote before stopping, the ring is replaced by the next measurement
+        return True
+
+    def rvna_instance(self):  # Process id of the running RVNA.exe started with the application, None if it is unknown or has exited
+        if self.rvna_process is None or self.rvna_process.poll() is not None:
+            return None
+        return self.rvna_process.pid
+
+    def start_acquisition(self):
+        global CMT
+        from multiprocessing import Process, Queue
+        from RVNA_Acquisition import SweepRing, acquisition_process, DEFAULT_MAX_POINTS
+        from RVNA_CalState import cal_file_points
 
-        self.s11_graph.addSeries(self.s11_series)  # Adds series to graph
-        self.s11_series.attachAxis(self.frequency_axis)  # Attaches both axis to the series
-        self.s11_series.attachAxis(self.s11_mag_axis)
-        self.s11_graph.setTitle('Most Recent Antenna Reflection Data: Resonating at %0.2f MHz' % (float(current_file_contents['Inflection Frequency [Hz]'][0]) / 1e6))  # Changes title based on recent inflection impedance value
+        # The acquisition process opens its own connection to the RVNA
+        CMT.close()
+        del CMT
+        self.rvna_is_connected = 0
 
-        self.inflection_frequency_series.clear()  # Clears data from series
-        self.s11_min_series.clear()  # Clears data from series
-        self.frequency_graph.removeSeries(self.inflection_frequency_series)  # Removes series from graph
-        self.frequency_graph.removeSeries(self.s11_min_series)
-        log_file_contents = pd.read_csv(self.log_file_path)  # Reads data log file as dataframe
-        inflection_frequency = log_file_contents['Inflection Frequency [Hz]'].rolling(self.frequency_smoothing).mean().tolist()  # Creates inflection frequency list
-        inflection_frequency = inflection_frequency[(self.frequency_smoothing - 1):]
-        elapsed_time_seconds = log_file_contents['Elapsed Times [s]'].tolist()  # Creates elapsed time list
-        min_s11 = log_file_contents['S11 at Inflection Frequency [dB]'].tolist()  # Creates minimum S11 list
+        if self.sweep_ring is not None:  # Ring of an earlier measurement
+            self.sweep_ring.close()
+        self.sweep_ring = SweepRing(max_points=cal_file_points(self.cal_file_directory) or DEFAULT_MAX_POINTS, create=True)
+        self.attach_sweep_ring(self.sweep_ring)
+
+        self.acquisition_commands = Queue()
+        self.acquisition = Process(target=acquisition_process, args=(self.sweep_ring.name, self.acquisition_commands, MeasurementThread.measurements_directory,
+                                                                     MeasurementThread.input_imaginary_impedance_smoothing_window, MeasurementThread.burst_sweeps,
+                                                                     int(self.time_inbetween_measurements), ServerTransferThread.outbox_path))
+        self.acquisition.start()
+        self.sweep_ring_timer.start()
+
+    def attach_sweep_ring(self, sweep_ring):  # Starts reading a new session from the ring
+        from RVNA_History import SweepHistory, LOG_COLUMNS
+        from RVNA_TrendStats import TREND_COLUMNS
+        self.sweep_ring = sweep_ring
+        self.last_frame = 0
+        self.history = SweepHistory(columns=LOG_COLUMNS + TREND_COLUMNS + HOUSEKEEPING_COLUMNS)
+        self.latest_features = None
+
+    def send_acquisition_command(self, command, value=None):
+        if self.acquisition is not None and self.acquisition.is_alive():
+            self.acquisition_commands.put((command, value))
+
+    def read_sweep_ring(self):  # Called by the ring timer, takes in every sweep written since the last call
+        latest_frame = self.sweep_ring.latest_frame()
+        if latest_frame == self.last_frame:
+            if self.acquisition is not None and not self.acquisition.is_alive():  # Measurement stopped and every sweep was read
+                self.sweep_ring_timer.stop()
+            return
+        frame = None
+        for frame_number in range(max(self.last_frame + 1, latest_frame - self.sweep_ring.slots + 1), latest_frame + 1):  # Frames already overwritten are skipped
+            new_frame = self.sweep_ring.read(frame_number)
+            if new_frame is None or not new_frame.copy():  # Overwritten while it was copied, the sweep is dropped
+                continue
+            self.history.append(new_frame.row[:len(self.history.columns)])
+            ServerTransferThread.add_session_file(new_frame.file_name)  # Sweep written event, adds the file to the upload index
+            frame = new_frame
+        self.last_frame = latest_frame
+        if frame is None:
+            return
 
-        for i in range(len(inflection_frequency)):
-            self.inflection_frequency_series.append(QPointF((elapsed_time_seconds[i + (self.frequency_smoothing - 1)] / 60), (inflection_frequency[i]) / 1e6))  # Appends all points to series
+        self.history.add_trace(*frame.trace)
+        self.latest_features = frame.values()
+        self.measurement_file_directory = MeasurementThread.measurements_directory + "\\" + frame.file_name
+        self.log_file_path = MeasurementThread.measurements_directory + "\\0_data_log.txt"
+        self.upload_transfer.request_transfer()  # The acquisition process has queued the sweep in the outbox
+        self.graphing()
+
+    def external_files_changed(self, directory):  # Called by the file system watcher
+        user_named_folder = path.basename(ServerTransferThread.measurements_directory)
+        for file_name in ServerTransferThread.index_external_files():
+            self.upload_transfer.outbox.enqueue(PRIORITY_S_PARAMETERS, ServerTransferThread.measurements_directory + "\\" + file_name, user_named_folder, file_name)
+        self.upload_transfer.request_transfer()
+
+    def burst_change(self, sweeps):
+        MeasurementThread.burst_sweeps = max(int(sweeps), 1)
+        self.send_acquisition_command("burst", MeasurementThread.burst_sweeps)
+        self.statusBar().showMessage(f"Sweeps Averaged per Measurement Changed to {MeasurementThread.burst_sweeps}", 10000)
+
+    def bandwidth_change(self, bandwidth):
+        ServerTransferThread.bandwidth_limit = int(bandwidth) * 1000
+        self.statusBar().showMessage(f"Upload Bandwidth Limit Changed to {bandwidth} kB/s", 10000)
+
+    def graphing(self):  # Is called after new sweeps were read from the ring
+        import numpy as np
+
+        history = self.history  # Bounded history filled from the ring, no files are read back
+        if history is None or len(history) == 0:
+            return
 
-        for i in range(len(elapsed_time_seconds)):
-            self.s11_min_series.append(QPointF((elapsed_time_seconds[i] / 60), min_s11[i]))
+        frequency, s11_mag = history.latest_trace()[:2]
+        self.s11_series.replace([QPointF(f / 1e9, s) for f, s in zip(frequency.tolist(), s11_mag.tolist())])  # Replaces all points of the series at once
+        self.s11_graph.setTitle('Most Recent Antenna Reflection Data: Resonating at %0.2f MHz' % (history.latest()['Inflection Frequency [Hz]'] / 1e6))  # Changes title based on recent inflection impedance value
+        features = self.latest_features
+        if features is not None and features['Bandwidth [Hz]'] == features['Bandwidth [Hz]']:  # Adds bandwidth and Q when the deepest resonance is below -10 dB
+            self.s11_graph.setTitle(self.s11_graph.title() + ', -10 dB Bandwidth %0.1f MHz, Q %0.1f' % (features['Bandwidth [Hz]'] / 1e6, features['Q Factor']))
+
+        trend = history.trend()  # Full session at a fixed number of points, older data is averaged
+        elapsed_time_minutes = history.column(trend, 'Elapsed Times [s]') / 60
+        inflection_frequency = history.column(trend, 'Inflection Frequency [Hz]') / 1e6
+        min_s11 = history.column(trend, 'S11 at Inflection Frequency [dB]')
+
+        smoothed_column = rolling_mean_column(self.frequency_smoothing)
+        if smoothed_column is not None:  # Rolling average kept by the measurement thread for every sweep, switching windows costs nothing
+            smoothed_frequency = history.column(trend, smoothed_column) / 1e6
+            smoothed_times = elapsed_time_minutes[smoothed_frequency == smoothed_frequency]  # Skips sweeps before the window was full
+            smoothed_frequency = smoothed_frequency[smoothed_frequency == smoothed_frequency]
+        else:
+            if len(inflection_frequency) >= self.frequency_smoothing:
+                smoothed_frequency = np.convolve(inflection_frequency, np.ones(self.frequency_smoothing) / self.frequency_smoothing, 'valid')  # Rolling average
+            else:
+                smoothed_frequency = inflection_frequency[:0]
+            smoothed_times = elapsed_time_minutes[(self.frequency_smoothing - 1):]
+        drift_rate = history.latest()['Tracked Drift Rate [MHz/min]']
+        if drift_rate == drift_rate:  # Not NaN
+            self.frequency_graph.setTitle('Inflection Frequency Over Time: Drifting %+0.3f MHz/min' % drift_rate)
 
-        self.frequency_graph.addSeries(self.inflection_frequency_series)  # Adds series to graph
-        self.frequency_graph.addSeries(self.s11_min_series)
-        self.inflection_frequency_series.attachAxis(self.inflection_frequency_axis)  # Attaches both axis to the inflection frequency series
-        self.inflection_frequency_series.attachAxis(self.time_elapsed_axis)
-        self.s11_min_series.attachAxis(self.s11_min_axis)  # Attaches both axis to the minimum S11 series
-        self.s11_min_series.attachAxis(self.time_elapsed_axis)
+        self.inflection_frequency_series.replace([QPointF(t, f) for t, f in zip(smoothed_times.tolist(), smoothed_frequency.tolist())])
+        self.s11_min_series.replace([QPointF(t, s) for t, s in zip(elapsed_time_minutes.tolist(), min_s11.tolist())])
 
     def stop_measurement(self):
         self.menu_bar.show()
-        self.measurement_timer.stop()
+        self.send_acquisition_command("stop")  # The acquisition process finishes its current sweep and closes, the ring timer stops after reading it
         #self.main_widget_textedit.append("Measurements Stopped")  # Updates Text Editor
 
     def enter_time_elapsed(self):
@@ -468,12 +636,14 @@ class RVNAMainWindow(QMainWindow):
                 pass
 
     def time_change(self, time_inbetween):
-        self.measurement_timer.setInterval(int(time_inbetween) * 1000)
+        self.time_inbetween_measurements = int(time_inbetween)
+        self.send_acquisition_command("interval", int(time_inbetween))
         #self.main_widget_textedit.append(f"Time inbetween Measurements Changed to {time_inbetween} Seconds")
         self.statusBar().showMessage(f"Time inbetween Measurements Changed to {time_inbetween} Seconds", 10000)
 
     def smoothing_change(self, smoothing):
         MeasurementThread.input_imaginary_impedance_smoothing_window = smoothing
+        self.send_acquisition_command("smoothing", smoothing)
         #self.main_widget_textedit.append(f"Imaginary Impedance Smoothing Changed to {smoothing}")
         self.statusBar().showMessage(f"Imaginary Impedance Smoothing Changed to {smoothing}", 10000)
 
@@ -502,21 +672,46 @@ class MeasurementThread(QThread):
     # Initialized class variables
     input_imaginary_impedance_smoothing_window = None
     measurements_directory = None
+    burst_sweeps = 1  # Sweeps averaged on the computer for each measurement, 1 turns burst averaging off
+    burst_outlier_rejection = True  # Leaves sweeps far from the median of the burst out of the average
+    housekeeping = None  # HousekeepingCache kept up to date by a HousekeepingThread, the sweeps only read the cached values
 
     def __init__(self, smoothing_variable):
         MeasurementThread.input_imaginary_impedance_smoothing_window = smoothing_variable
-        self.log_list = []
+        self.history = None  # Fixed-size history of the session used for analysis and the trend graph, created on the first sweep
+        self.history_directory = None
         self.init = 1
         self.start_elapsed_time = 0.0
         self.numb_file = 1
+        self.catalog = None  # Session catalog, opened on the first sweep
+        self.latest_features = None  # Resonance features of the most recent sweep
+        self.trend_statistics = None  # Streaming rolling averages, drift rate and tracked frequency of the session
         super().__init__()
 
     def run(self):
+        from RVNA_History import SweepHistory, LOG_COLUMNS
+        from RVNA_TrendStats import TrendStatistics, TREND_COLUMNS
+        from RVNA_BurstAveraging import read_burst, average_burst, electrical_delays, derived_quantities
+        from RVNA_SweepWriter import write_sweep_file
+        from RVNA_Features import extract_features
+
+        if self.history_directory != MeasurementThread.measurements_directory:  # New measurement folder, starts a new history
+            self.history = SweepHistory(columns=LOG_COLUMNS + TREND_COLUMNS + HOUSEKEEPING_COLUMNS)
+            self.trend_statistics = TrendStatistics()
+            self.history_directory = MeasurementThread.measurements_directory
+            self.init = 1
+            self.numb_file = 1  # File numbers match the data log rows of the folder
+
         CMT.write("TRIG:SOUR BUS")  # Set sweep source to BUS for automated measurement
         CMT.query("*OPC?")  # Wait for measurement to complete
 
-        CMT.write("TRIG:SING")  # Trigger a single sweep
-        CMT.query("*OPC?")  # Wait for measurement to complete
+        if MeasurementThread.burst_sweeps > 1:  # Burst mode, fast sweeps back-to-back averaged as complex data on the computer
+            delays = electrical_delays(CMT)  # Applied to the averaged data so it matches the formatted traces of a single sweep
+            gamma = average_burst(read_burst(CMT, MeasurementThread.burst_sweeps), MeasurementThread.burst_outlier_rejection)
+        else:
+            gamma = None
+            CMT.write("TRIG:SING")  # Trigger a single sweep
+            CMT.query("*OPC?")  # Wait for measurement to complete
 
         current_datetime = datetime.now()
 
@@ -533,117 +728,101 @@ class MeasurementThread(QThread):
         # Read frequency data
         freq = CMT.query_ascii_values("SENS1:FREQ:DATA?")
 
-        # Read smith chart impedance data
-        CMT.write("CALC1:PAR2:SEL")
-        imp = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
-        real_imp = imp[::2]
-        imag_imp = imp[1::2]
-
-        # Read log mag data
-        CMT.write("CALC1:PAR3:SEL")
-        log_mag = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
-        log_mag = log_mag[::2]
-
-        # Read phase data
-        CMT.write("CALC1:PAR1:SEL")
-        phase = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
-        phase = phase[::2]
-
-        vna_temp = CMT.write("SYST:TEMP:SENS<1>?")
+        if gamma is not None:
+            # Log mag, phase and smith chart impedance data from the averaged reflection coefficient
+            log_mag, phase, real_imp, imag_imp = [x.tolist() for x in derived_quantities(gamma, freq, delays)]
+        else:
+            # Read smith chart impedance data
+            CMT.write("CALC1:PAR2:SEL")
+            imp = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
+            real_imp = imp[::2]
+            imag_imp = imp[1::2]
+
+            # Read log mag data
+            CMT.write("CALC1:PAR3:SEL")
+            log_mag = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
+            log_mag = log_mag[::2]
+
+            # Read phase data
+            CMT.write("CALC1:PAR1:SEL")
+            phase = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
+            phase = phase[::2]
 
         CMT.write("TRIG:SOUR INT")  # Set sweep source to INT after measurements are done
 
         CMT.query("*OPC?")  # Wait for measurement to complete
 
-        current_time_hour_list = [int(current_time_hour)] * len(freq)  # Creates lists from single values of hour, minute, and second
-
-        current_time_minute_list = [int(current_time_minute)] * len(freq)
-
-        current_time_second_list = [int(current_time_second)] * len(freq)
-
-        vna_temp = [(vna_temp * (9 / 5)) + 32] * len(freq)  # Creates list from VNA temp value
+        # Temperature and status read by the housekeeping thread, no extra queries are made during the sweep
+        if MeasurementThread.housekeeping is not None:
+            housekeeping_row = MeasurementThread.housekeeping.row()
+        else:
+            housekeeping_row = [float("nan")] * len(HOUSEKEEPING_COLUMNS)
+        vna_temp = housekeeping_row[0]  # VNA temp in F
 
         self.measurement_update.emit(f"Measurement Taken at {current_datetime.strftime('%m-%d-%Y_%H-%M-%S')}\n")  # Emits signal of the time a measurement was taken to the TextEdit
 
-        # Creates dictionary that will be in dataframe object
-        data_dictionary = {'Current Hour': current_time_hour_list, 'Current Minute': current_time_minute_list,
-                           'Current Second': current_time_second_list, 'Frequency [Hz]': freq, 'S11 [dB]': log_mag,
-                           'S11 Phase [DEG]': phase, 'Zin [RE ohm]': real_imp, 'Zin [IM ohm]': imag_imp,
-                           'VNA Temp [F]': vna_temp}
-
-        data_frame = pd.DataFrame(data_dictionary)  # Creating dataframe
-
-        # Initializations for minimum S11 and inflection impedance
-        returnloss_mag_min = 0.0
-        inflection_impedance = 0.0
-        inflection_frequency = 0.0
-
-        imag_imp_df = pd.DataFrame({'Impedance': imag_imp}) # Imaginary impedance list
-
-        corresponding_returnloss_mag = log_mag
-        corresponding_impedance_real = real_imp
-        # Creates a rolling average of imaginary impedance values
-        smoothed_input_impedance_imag = imag_imp_df['Impedance'].rolling(MeasurementThread.input_imaginary_impedance_smoothing_window).mean()
-        # Finds when the imagnary impedance crosses the zero to get closes to a purely real impedance
-        for i in range(1, len(smoothed_input_impedance_imag)-1):  # Calculates the inflection frequency, real inflection impedance, and minimum S11. The inflection impedance is found by searching the measured close-to-purely real impedances and defining the one with the lowest magnitude S11 as the inflection impedance
-            if abs(smoothed_input_impedance_imag[i - 1]) > abs(smoothed_input_impedance_imag[i]) and abs(smoothed_input_impedance_imag[i + 1]) > abs(smoothed_input_impedance_imag[i]):
-                if corresponding_returnloss_mag[i] < returnloss_mag_min:    # Inflection impedance will be the purely real impedance with the lowest magnitude S11
-                    returnloss_mag_min = corresponding_returnloss_mag[i]
-                    inflection_frequency = freq[i]
-                    inflection_impedance = corresponding_impedance_real[i]
-
-        # Creating lists from single values
-        real_inflection_impedance = [inflection_impedance] * len(freq)
-        min_returnloss = [returnloss_mag_min] * len(freq)
-        min_returnloss_freq = [inflection_frequency] * len(freq)
-
-        # Inserts extra columns of data
-        data_frame.insert(3, 'Inflection Frequency [Hz]', min_returnloss_freq)
-        data_frame.insert(9, 'S11 at Inflection Frequency [dB]', min_returnloss)
-        data_frame.insert(10, 'Inflection Impedance [RE ohm]', real_inflection_impedance)
+        # Calculates the inflection frequency, real inflection impedance, and minimum S11 together with the extended resonance features.
+        # The inflection impedance is found by searching the measured close-to-purely real impedances (where the smoothed imaginary
+        # impedance is closest to zero) and defining the one with the lowest magnitude S11 as the inflection impedance
+        self.latest_features = extract_features(freq, log_mag, phase, real_imp, imag_imp, int(MeasurementThread.input_imaginary_impedance_smoothing_window))
+        inflection_frequency = float(self.latest_features['Inflection Frequency [Hz]'][0])
+        inflection_impedance = float(self.latest_features['Inflection Impedance [RE ohm]'][0])
+        returnloss_mag_min = float(self.latest_features['S11 at Inflection Frequency [dB]'][0])
 
         file_name = f'{self.numb_file}_' + 'S_parameters_' + str(current_datetime.strftime('%m-%d-%Y_%H-%M-%S')) + '.txt'  # Creates file name based on time measurement was taken
 
         self.numb_file += 1  # Increment by 1, makes listing s-parameter files by name while maintaining proper order easier
 
-        data_frame.to_csv(MeasurementThread.measurements_directory+"\\"+file_name, index=False, sep=',', header=True)  # Saves dataframe as csv
+        # Saves the sweep as csv, the same bytes the earlier pandas to_csv call wrote
+        write_sweep_file(MeasurementThread.measurements_directory+"\\"+file_name, current_time_hour, current_time_minute, current_time_second,
+                         freq, log_mag, phase, real_imp, imag_imp, inflection_frequency, returnloss_mag_min, inflection_impedance, vna_temp)
 
         elapsed_time_seconds = round(abs(end_elapsed_time - self.start_elapsed_time))  # Calculating elapsed time from a start and end time
 
         # Creates data for data log file
         log_new_row = [int(current_time_hour), int(current_time_minute), int(current_time_second), elapsed_time_seconds, inflection_frequency, inflection_impedance, returnloss_mag_min]
+        log_new_row += self.trend_statistics.update(elapsed_time_seconds, inflection_frequency)  # Smoothed values and drift rate, constant cost per sweep
+        log_new_row += housekeeping_row
 
         if self.init == 1:
-            self.log_list = log_new_row  # If it is the first measurement, equate list as the first row
             self.init = 0
-            log_frame_dict = {'Current Hour': [self.log_list[0]], 'Current Minute': [self.log_list[1]], 'Current Second': [self.log_list[2]], 'Elapsed Times [s]': [self.log_list[3]], 'Inflection Frequency [Hz]': [self.log_list[4]], 'Inflection Impedance [RE ohm]': [self.log_list[5]], 'S11 at Inflection Frequency [dB]': [self.log_list[6]]}  # Initializes dictionary for first version of dataframe
-            log_frame = pd.DataFrame(log_frame_dict)
-        elif self.numb_file == 3:  # flips back initial vertical array for dataframe creation
-            self.log_list = row_stack((self.log_list, log_new_row))  # Appends row to existing list from the Main Window
-            self.log_list.tolist()
-            log_frame = pd.DataFrame(self.log_list, columns=['Current Hour', 'Current Minute', 'Current Second', 'Elapsed Times [s]', 'Inflection Frequency [Hz]', 'Inflection Impedance [RE ohm]', 'S11 at Inflection Frequency [dB]'])  # Initializes dataframe
-        else:
-            self.log_list = row_stack((self.log_list, log_new_row))  # Appends row to existing list from the Main Window
-            self.log_list.tolist()
-            log_frame = pd.DataFrame(self.log_list, columns=['Current Hour', 'Current Minute', 'Current Second', 'Elapsed Times [s]', 'Inflection Frequency [Hz]', 'Inflection Impedance [RE ohm]', 'S11 at Inflection Frequency [dB]'])  # Initializes dataframe
 
-        log_frame.to_csv(MeasurementThread.measurements_directory+"\\0_data_log.txt", index=False, sep=',', header=True)  # Saves dataframe as csv
+        self.history.append(log_new_row)
+        self.history.add_trace(freq, log_mag, phase, real_imp, imag_imp)
+
+        # Appends the new row to the data log instead of rewriting the whole file
+        log_file_path = MeasurementThread.measurements_directory+"\\0_data_log.txt"
+        write_header = not path.exists(log_file_path)
+        with open(log_file_path, 'a', newline='') as log_file:
+            if write_header:
+                log_file.write(','.join(LOG_COLUMNS + TREND_COLUMNS + HOUSEKEEPING_COLUMNS) + linesep)
+            log_file.write(','.join(repr(float(x)) for x in log_new_row) + linesep)
+
+        # Adds the sweep to the catalog of all sessions, a catalog problem never stops the measurement
+        try:
+            if self.catalog is None:
+                self.catalog = SessionCatalog()
+            self.catalog.record_sweep(MeasurementThread.measurements_directory, self.numb_file - 1, file_name, current_datetime.isoformat(timespec='seconds'),
+                                      elapsed_time_seconds, inflection_frequency, inflection_impedance, returnloss_mag_min, vna_temp)
+        except sqlite3.Error:
+            pass
 
         self.measurements_filedirectory.emit([file_name, "\\0_data_log.txt"])
 
 
 class ServerTransferThread(QThread):
     measurements_directory = None
+    outbox_path = "upload_outbox.db"  # Persistent queue of files waiting to be uploaded
+    bandwidth_limit = 0  # Upload limit in bytes per second, 0 means no limit
+    session_files = []  # In-memory ordered index of the s-parameter files of the current session
+    session_file_set = set()
 
-    def __init__(self, data_type):
+    def __init__(self):
         super().__init__()
-        # Determines wither the thread object with transmit the data_log file or the s-parameters
-        self.type_of_data_transfer = data_type
         # Setting Constant Variables for SSH
-        self.ssh = SSHClient()  # Defines SSH client
-        self.ssh.set_missing_host_key_policy(AutoAddPolicy())  # Adds host key if missing
+        self.ssh = None  # SSH client is created on the first connection attempt
         self.sftp_session = None
-        self.scp = None
+        self.remote_folder = None  # Server folder the SFTP session is currently in
 
         # Server Access Information
         self.server_host = User_Pass_Key.hostname
@@ -651,90 +830,196 @@ class ServerTransferThread(QThread):
         self.server_password = User_Pass_Key.password
         self.server_root_directory = User_Pass_Key.remote_path
 
-        # Used to increment through list
-        self.numb_file = 1
-
         self.connection_var = 0
 
-    def run(self):
-        if ServerTransferThread.measurements_directory is not None:
-            if self.connection_var == 0:
-                try:
-                    self.ssh.connect(self.server_host, username=self.server_user, password=self.server_password)  # Establishes SSH connection
-                    self.sftp_session = self.ssh.open_sftp()  # Opens SFTP session
-                    self.scp = SCPClient(self.ssh.get_transport())
-                    self.connection_var = 1
-                except:
-                    return
-            else:
-                pass
-
-            user_named_folder = path.basename(path.normpath(ServerTransferThread.measurements_directory))  # Gets name of user specified directory
+        # Set when a transfer is requested while one is still running
+        self.transfer_pending = 0
+        self.finished.connect(self.run_pending_transfer)
 
-            try:
-                self.sftp_session.chdir(User_Pass_Key.remote_path + user_named_folder)  # Changes directory to specified file on the server
-            except:
-                try:
-                    self.sftp_session.mkdir(User_Pass_Key.remote_path + user_named_folder)  # Creates directory of specified file on server
-                    self.sftp_session.chdir(User_Pass_Key.remote_path + user_named_folder)  # Changes directory to specified file on the server
-                except:
-                    self.connection_var = 0
-                    return
+        # Delta-Append Upload State ===============================================================
+        self.remote_log_offset = 0  # Number of bytes of the local data log already on the server
+        self.remote_log_tail = b""  # Last bytes uploaded, used to detect if the local data log was rewritten
+        self.remote_log_folder = None  # Server folder the offset belongs to
 
-            s_parameter_list = listdir(ServerTransferThread.measurements_directory)  # get all files in a directory
-            s_parameter_list_full_path = [path.join(ServerTransferThread.measurements_directory, f) for f in s_parameter_list]  # add absolute paths to each file
-            s_parameter_list_full_path.sort(key=lambda x: path.getmtime(x))  # sorts paths of files by date created
-            s_parameter_list = [path.basename(g) for g in s_parameter_list_full_path]  # Gets list of files with just the name
+        # Store-and-Forward Upload State ==========================================================
+        self.bandwidth_limiter = BandwidthLimiter(ServerTransferThread.bandwidth_limit)
+        self.outbox = UploadOutbox(ServerTransferThread.outbox_path)
 
-            if self.type_of_data_transfer == "data_log":
-                try:
-                    if len(s_parameter_list) > self.numb_file:
-                        try:
-                            self.sftp_session.stat(self.sftp_session.getcwd() + '/' + "0_data_log.txt")
-                            self.sftp_session.chmod(self.sftp_session.getcwd() + '/' + "0_data_log.txt", 0o666)
-                            self.sftp_session.chmod(self.sftp_session.getcwd() + '/' + "Latest_Sparams.txt", 0o666)
-                        except:
-                            pass
-                        self.scp.put(ServerTransferThread.measurements_directory + '\\' + "0_data_log.txt", self.sftp_session.getcwd() + '/' + "0_data_log.txt")  # Copies new data log from local to remote server
-                        self.scp.put(ServerTransferThread.measurements_directory + '\\' + s_parameter_list[-2], self.sftp_session.getcwd() + '/' + "Latest_Sparams.txt")  # Copies latest s-parameter file to
-                    else:
-                        pass
-                except:
-                    self.connection_var = 0
-                    pass
+    def run(self):  # Outbox entries hold their own folders, so they are sent even before a session starts
+        self.drain_outbox()
 
-            elif self.type_of_data_transfer == "s_parameters":
+    def connect_to_server(self):
+        from paramiko import SSHClient, AutoAddPolicy
 
-                files_in_server = self.sftp_session.listdir()
-                files_in_server_full_paths = [self.sftp_session.getcwd() + '/' + x for x in files_in_server]
+        if self.ssh is None:
+            self.ssh = SSHClient()  # Defines SSH client
+            self.ssh.set_missing_host_key_policy(AutoAddPolicy())  # Adds host key if missing
+        try:
+            self.ssh.connect(self.server_host, username=self.server_user, password=self.server_password)  # Establishes SSH connection
+            self.sftp_session = self.ssh.open_sftp()  # Opens SFTP session
+            self.connection_var = 1
+            self.remote_folder = None
+            return True
+        except:
+            return False
 
-                [self.sftp_session.chmod(x, 0o444) for x in files_in_server_full_paths]
-                try:
-                    [self.s_parameter_file_put(x, y) for x, y in zip(s_parameter_list_full_path, s_parameter_list)]  # Copies new data log from local to remote server
-                    [self.sftp_session.chmod(x, 0o666) for x in files_in_server_full_paths]
+    def change_remote_folder(self, user_named_folder):
+        if self.remote_folder == user_named_folder:  # Already in the folder, saves a round trip per file
+            return
+        try:
+            self.sftp_session.chdir(User_Pass_Key.remote_path + user_named_folder)  # Changes directory to specified file on the server
+        except IOError:
+            self.sftp_session.mkdir(User_Pass_Key.remote_path + user_named_folder)  # Creates directory of specified file on server
+            self.sftp_session.chdir(User_Pass_Key.remote_path + user_named_folder)
+        self.remote_folder = user_named_folder
+
+    def drain_outbox(self):
+        self.bandwidth_limiter.bytes_per_second = ServerTransferThread.bandwidth_limit
+        entry = self.outbox.next_entry()
+        while entry is not None:
+            if self.connection_var == 0 and not self.connect_to_server():
+                return  # Entries stay in the outbox until the server can be reached again
+
+            entry_id, priority, local_path, remote_folder, remote_name, method = entry
+            if not path.isfile(local_path):  # Nothing left to send, or not a file that can be sent
+                self.outbox.remove(entry_id)
+                entry = self.outbox.next_entry()
+                continue
 
-                except:
+            try:
+                self.change_remote_folder(remote_folder)
+                if method == METHOD_APPEND:
+                    self.data_log_append(remote_folder, local_path, remote_name)
+                else:
+                    self.throttled_put(local_path, remote_name)
+                self.outbox.remove(entry_id)
+            except:
+                if not self.connection_alive():
                     self.connection_var = 0
-        else:
-            pass
+                    return  # Server lost, the entry is not to blame and keeps its place
+                self.outbox.record_failure(entry_id)  # Only this entry fails, it waits for a retry while the others go ahead
+
+            # The next entry is picked again after each file, so new data log updates go ahead of the remaining s-parameter files
+            entry = self.outbox.next_entry()
 
-    def s_parameter_file_put(self, x, y):
+    def connection_alive(self):  # Tells a failed file apart from a lost connection
         try:
-            self.scp.put(x, self.sftp_session.getcwd() + '/' + y)
+            self.sftp_session.stat(".")
+            return True
         except:
+            return False
+
+    def throttled_put(self, local_path, remote_name):
+        remote_path = self.sftp_session.getcwd() + '/' + remote_name
+        try:
+            self.sftp_session.chmod(remote_path, 0o666)  # Latest_Sparams.txt is overwritten every sweep
+        except IOError:
             pass
+        self.sftp_session.put(local_path, remote_path, callback=self.bandwidth_limiter.put_callback())
+
+    def throttled_write(self, remote_file, data):
+        for i in range(0, len(data), 32768):  # Writes in chunks so the bandwidth limit is kept during large copies
+            remote_file.write(data[i:i + 32768])
+            self.bandwidth_limiter.consume(len(data[i:i + 32768]))
+
+    def request_transfer(self):  # Called when a sweep was written, transfers run only when there is something new
+        if self.isRunning():
+            self.transfer_pending = 1  # Runs again once the current transfer finishes
+        else:
+            self.start()
+
+    def run_pending_transfer(self):
+        if self.transfer_pending == 1:
+            self.transfer_pending = 0
+            self.start()
+
+    @classmethod
+    def new_session(cls, directory):
+        cls.measurements_directory = directory
+        cls.session_files = []
+        cls.session_file_set = set()
+
+    @classmethod
+    def add_session_file(cls, file_name):  # Adds a newly written s-parameter file to the end of the index
+        if file_name not in cls.session_file_set:
+            cls.session_file_set.add(file_name)
+            cls.session_files.append(file_name)
+
+    @classmethod
+    def index_external_files(cls):  # Only called by the file system watcher, adds files written outside of the measurement thread
+        if cls.measurements_directory is None:
+            return []
+        new_files = [f for f in listdir(cls.measurements_directory) if f not in cls.session_file_set and cls.is_sweep_file(f)
+                     and path.isfile(path.join(cls.measurements_directory, f))]
+        new_files.sort(key=lambda x: path.getmtime(path.join(cls.measurements_directory, x)))  # sorts new files by date created
+        for file_name in new_files:
+            cls.add_session_file(file_name)
+        return new_files
+
+    @staticmethod
+    def is_sweep_file(file_name):  # Sweep files are named N_S_parameters_<date>.txt, the data log, caches and converted output are not uploaded
+        number, _, rest = file_name.partition("_")
+        return number.isdigit() and int(number) > 0 and rest.startswith("S_parameters_") and rest.endswith(".txt")
+
+    def data_log_append(self, user_named_folder, local_log=None, remote_name="0_data_log.txt"):
+        if local_log is None:
+            local_log = ServerTransferThread.measurements_directory + '\\' + "0_data_log.txt"
+        remote_log = self.sftp_session.getcwd() + '/' + remote_name
+
+        if self.remote_log_folder != user_named_folder:  # New measurement folder, nothing of it is on the server yet
+            self.remote_log_offset = 0
+            self.remote_log_tail = b""
+            self.remote_log_folder = user_named_folder
+
+        local_size = path.getsize(local_log)
+        if local_size == self.remote_log_offset:  # Nothing new was written since the last upload
+            return
+
+        with open(local_log, 'rb') as local_file:
+            # Checks that the bytes already on the server are still the start of the local data log
+            tail_start = self.remote_log_offset - len(self.remote_log_tail)
+            local_file.seek(max(tail_start, 0))
+            local_unchanged = local_size > self.remote_log_offset and local_file.read(len(self.remote_log_tail)) == self.remote_log_tail
+
+            try:
+                remote_unchanged = self.sftp_session.stat(remote_log).st_size == self.remote_log_offset
+            except IOError:
+                remote_unchanged = False
+
+            if self.remote_log_offset > 0 and local_unchanged and remote_unchanged:
+                local_file.seek(self.remote_log_offset)
+                new_rows = local_file.read(local_size - self.remote_log_offset)
+                with self.sftp_session.open(remote_log, 'ab') as remote_file:  # Appends only the new tail of the data log
+                    self.throttled_write(remote_file, new_rows)
+            else:
+                # Falls back to a full copy when the server and local data logs no longer line up
+                try:
+                    self.sftp_session.chmod(remote_log, 0o666)
+                except IOError:
+                    pass
+                local_file.seek(0)
+                new_rows = local_file.read(local_size)
+                with self.sftp_session.open(remote_log, 'wb') as remote_file:
+                    self.throttled_write(remote_file, new_rows)
+
+        self.remote_log_offset = local_size
+        self.remote_log_tail = new_rows[-64:]
 
 
 class CalibrationDialog(QDialog):
 
     def __init__(self):
         super().__init__()
+        from RVNA_CalScoring import CalibrationScorer
         self.setWindowTitle("Calibration Check")  # Set Window Title
         self.setWindowIcon(QIcon("Resources\\SmithChartIcon.png"))  # Set Window Icon
         self.resize(1250, 600)  # Setting Window Size
 
         # setting default cal state. 1 = cal free space, 2 = cal on body
         self.cal_state = 1
+        self.scorer = CalibrationScorer(self.cal_state)  # Compares the live sweeps with the stored reference of the cal state
+        self.auto_advance = True  # Moves on by itself once the sweeps meet the acceptance criteria, only for cal states with a saved reference
+        self.last_result = None  # Result of the check with the most recent sweep
 
         # Font ================================================================
         self.text_font = QFont()
@@ -770,6 +1055,9 @@ class CalibrationDialog(QDialog):
         self.s11_graph.legend().hide()
         self.s11_graph.addAxis(self.frequency_axis, Qt.AlignmentFlag.AlignBottom)
         self.s11_graph.addAxis(self.s11_mag_axis, Qt.AlignmentFlag.AlignLeft)
+        self.s11_graph.addSeries(self.s11_series)  # Adds series to graph once, graphing only replaces its points
+        self.s11_series.attachAxis(self.frequency_axis)  # Attaches both axis to the series
+        self.s11_series.attachAxis(self.s11_mag_axis)
         self.s11_graph_view = QChartView(self.s11_graph)
         self.s11_graph_view.setRenderHint(QPainter.RenderHint.Antialiasing)
 
@@ -780,11 +1068,21 @@ class CalibrationDialog(QDialog):
         self.cal_prompt.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.cal_prompt.setFont(self.text_font)
 
+        # Adding Text showing the automatic check of the most recent sweeps
+        self.score_label = QLabel()
+        self.score_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.score_label.setFont(self.button_font)
+
         # Adding Push Button to continue cal
         accept_cal_button = QPushButton("Accept Calibration")
         accept_cal_button.clicked.connect(self.continue_cal)
         accept_cal_button.setFont(self.button_font)
 
+        # Adding Push Button to store the current response as the reference of the cal state
+        save_reference_button = QPushButton("Save as Reference")
+        save_reference_button.clicked.connect(self.save_reference_trace)
+        save_reference_button.setFont(self.button_font)
+
         # Adding Push Button to exit cal
         exit_cal_button = QPushButton("Exit Calibration")
         exit_cal_button.clicked.connect(self.exit_cal)
@@ -793,11 +1091,13 @@ class CalibrationDialog(QDialog):
         # Layout ==============================================================
         button_layout = QHBoxLayout()
         button_layout.addWidget(accept_cal_button)
+        button_layout.addWidget(save_reference_button)
         button_layout.addWidget(exit_cal_button)
 
         cal_layout = QVBoxLayout()
         cal_layout.addWidget(self.s11_graph_view)
         cal_layout.addWidget(self.cal_prompt)
+        cal_layout.addWidget(self.score_label)
         cal_layout.addLayout(button_layout)
         self.setLayout(cal_layout)
 
@@ -809,32 +1109,30 @@ class CalibrationDialog(QDialog):
 
     def graphing(self):
         global CMT
-        CMT.write("TRIG:SOUR BUS")  # Set sweep source to BUS for automated measurement
-        CMT.query("*OPC?")  # Wait for measurement to complete
+        from RVNA_CalScoring import read_s11_sweep, describe
+        frequency, s11_mag = read_s11_sweep(CMT)
 
-        CMT.write("TRIG:SING")  # Trigger a single sweep
-        CMT.query("*OPC?")  # Wait for measurement to complete
-
-        # Read frequency data
-        frequency = CMT.query_ascii_values("SENS1:FREQ:DATA?")
+        self.s11_series.replace([QPointF(f / 1e9, s) for f, s in zip(frequency, s11_mag)])  # Replaces all points of the series at once
 
-        # Read log mag data
-        CMT.write("CALC1:PAR3:SEL")
-        log_mag = CMT.query_ascii_values("CALC1:DATA:FDAT?")  # Get data as string
-        s11_mag = log_mag[::2]
+        # Automatic check of the recent sweeps against the acceptance criteria
+        result = self.scorer.add_sweep(frequency, s11_mag)
+        self.last_result = result
+        self.score_label.setText(describe(result))
+        if result["auto_advance"] and self.auto_advance:
+            self.continue_cal()
 
-        self.s11_series.clear()  # Clears data from series
-        self.s11_graph.removeSeries(self.s11_series)  # Removes series from graph
-
-        for i in range(len(frequency)):
-            self.s11_series.append(QPointF(frequency[i]/1e9, s11_mag[i]))  # Appends all points to series
-
-        self.s11_graph.addSeries(self.s11_series)  # Adds series to graph
-        self.s11_series.attachAxis(self.frequency_axis)  # Attaches both axis to the series
-        self.s11_series.attachAxis(self.s11_mag_axis)
+    def save_reference_trace(self):  # Average of the recent sweeps becomes the reference the cal state is checked against
+        from RVNA_CalScoring import CalibrationScorer, save_reference
+        if self.scorer.count == 0:
+            return
+        save_reference(self.cal_state, *self.scorer.mean_sweep())
+        self.scorer = CalibrationScorer(self.cal_state, previous=self.scorer.previous)
 
     def continue_cal(self):
+        from RVNA_CalScoring import CalibrationScorer
         if self.cal_state == 1:
+            self.update_timer.stop()  # No sweeps are checked while the message is open
+            free_space_response = self.scorer.mean_sweep() if self.scorer.count > 0 else None
             user_alert = QMessageBox()
             user_alert.setWindowTitle("Attach Antenna")
             user_alert.setText("Attach the Antenna onto the Body")
@@ -843,7 +1141,21 @@ class CalibrationDialog(QDialog):
             user_alert.exec()
             self.cal_prompt.setText("Does the Antenna Resonate on the Body?")
             self.cal_state += 1  # advance cal state
+            self.scorer = CalibrationScorer(self.cal_state, previous=free_space_response)  # On body has to differ from free space
+            self.last_result = None
+            self.update_timer.start()
         elif self.cal_state == 2:
+            if self.last_result is None or self.last_result["changed"] is not True:  # Antenna may not have been placed on the body yet
+                self.update_timer.stop()  # No sweeps are checked while the question is open
+                user_question = QMessageBox()
+                user_question.setWindowTitle("No Change Detected")
+                user_question.setText("The response has not changed from free space")
+                user_question.setInformativeText("Accept the calibration anyway?")
+                user_question.setIcon(QMessageBox.Icon.Warning)
+                user_question.setStandardButtons(QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+                if user_question.exec() != QMessageBox.StandardButton.Yes:
+                    self.update_timer.start()
+                    return
             self.update_timer.stop()
             self.accept()  # user has determined calibration is good
 
@@ -958,6 +1270,98 @@ class TimeChangeWidget(QWidget):    # Window used to change time inbetween measu
             string_error.exec()
 
 
+class BurstChangeWidget(QWidget):    # Window used to change the number of sweeps averaged per measurement
+    submit_burst = Signal(str)  # Signal that will be emitted to Main Window Object
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Change Burst Averaging")  # Set Window Title
+        self.setWindowIcon(QIcon("Resources\\ClockIcon.png"))
+        self.resize(400, 100)  # Set Window Size
+
+        # The two labels and text editor used to convey the information user must input
+        text_editor_label = QLabel("Sweeps Averaged per Measurement:")
+        units_label = QLabel("(1 for no averaging)")
+        self.line_edit = QLineEdit()
+
+        # Initial Horizontal layout used to order the labels and editor
+        text_edit_layout = QHBoxLayout()
+        text_edit_layout.addWidget(text_editor_label)
+        text_edit_layout.addWidget(self.line_edit)
+        text_edit_layout.addWidget(units_label)
+
+        # Adding the button to receive the data input by user
+        set_burst_button = QPushButton("Set Sweeps")
+        set_burst_button.clicked.connect(self.set_burst)
+
+        # Vertical layout used to place button below text editor
+        full_layout = QVBoxLayout()
+        full_layout.addLayout(text_edit_layout)
+        full_layout.addWidget(set_burst_button)
+
+        # Sets window layout
+        self.setLayout(full_layout)
+
+    def set_burst(self):
+        try:
+            int(self.line_edit.text())
+            self.submit_burst.emit(self.line_edit.text())  # Signal is emitted to Main Window
+            self.close()
+        except ValueError:
+            string_error = QMessageBox()
+            string_error.setWindowTitle("Error")
+            string_error.setText("Only Use Digits")
+            string_error.setIcon(QMessageBox.Icon.Critical)
+            string_error.setDefaultButton(QMessageBox.StandardButton.Ok)
+            string_error.exec()
+
+
+class BandwidthChangeWidget(QWidget):    # Window used to change the upload bandwidth limit
+    submit_bandwidth = Signal(str)  # Signal that will be emitted to Main Window Object
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Change Upload Bandwidth Limit")  # Set Window Title
+        self.setWindowIcon(QIcon("Resources\\ClockIcon.png"))
+        self.resize(400, 100)  # Set Window Size
+
+        # The two labels and text editor used to convey the information user must input
+        text_editor_label = QLabel("Upload Bandwidth Limit:")
+        units_label = QLabel("(kB/s, 0 for no limit)")
+        self.line_edit = QLineEdit()
+
+        # Initial Horizontal layout used to order the labels and editor
+        text_edit_layout = QHBoxLayout()
+        text_edit_layout.addWidget(text_editor_label)
+        text_edit_layout.addWidget(self.line_edit)
+        text_edit_layout.addWidget(units_label)
+
+        # Adding the button to receive the data input by user
+        set_bandwidth_button = QPushButton("Set Limit")
+        set_bandwidth_button.clicked.connect(self.set_bandwidth)
+
+        # Vertical layout used to place button below text editor
+        full_layout = QVBoxLayout()
+        full_layout.addLayout(text_edit_layout)
+        full_layout.addWidget(set_bandwidth_button)
+
+        # Sets window layout
+        self.setLayout(full_layout)
+
+    def set_bandwidth(self):
+        try:
+            int(self.line_edit.text())
+            self.submit_bandwidth.emit(self.line_edit.text())  # Signal is emitted to Main Window
+            self.close()
+        except ValueError:
+            string_error = QMessageBox()
+            string_error.setWindowTitle("Error")
+            string_error.setText("Only Use Digits")
+            string_error.setIcon(QMessageBox.Icon.Critical)
+            string_error.setDefaultButton(QMessageBox.StandardButton.Ok)
+            string_error.exec()
+
+
 class SmoothingChangeWidget(QWidget):    # Window used to change calibration file location
     impedance_smoothing = Signal(str)
 
@@ -1000,16 +1404,3 @@ class SmoothingChangeWidget(QWidget):    # Window used to change calibration fil
             string_error.setIcon(QMessageBox.Icon.Critical)
             string_error.setDefaultButton(QMessageBox.StandardButton.Ok)
             string_error.exec()
-
-
-class HelpWidget(QPdfView):
-
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Help Document")  # Set Window Title
-        self.setWindowIcon(QIcon("Resources\\HelpIcon.png"))
-        self.resize(850, 500)
-        self.help_pdf = QPdfDocument()
-        self.help_pdf.load("Resources\\GlucoseMeasuringHelp.pdf")  # Loads path of help document
-        self.setPageMode(QPdfView.PageMode.MultiPage)
-        self.setDocument(self.help_pdf)
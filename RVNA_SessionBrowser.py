@@ -0,0 +1,275 @@
+# Imports from python packages
+from PySide6.QtWidgets import QWidget, QPushButton, QLabel, QSlider, QVBoxLayout, QHBoxLayout, QFileDialog
+from PySide6.QtGui import QIcon, QPainter, QFont
+from PySide6.QtCore import QPointF, Qt
+from PySide6.QtCharts import QChart, QChartView, QLineSeries, QValueAxis
+from os import path, listdir, mkdir, getcwd, replace
+import json
+import numpy as np
+
+CACHE_FOLDER = ".rvna_cache"  # Created inside each session folder
+LEVEL_FACTOR = 4  # Each summary level averages this many rows of the level below it
+
+
+def sweep_number(file_name):  # Files are named N_S_parameters_<date>.txt, N gives the order they were measured in
+    try:
+        return int(file_name.split("_", 1)[0])
+    except ValueError:
+        return -1
+
+
+def read_columns(file_path, names):  # Reads the named columns of a csv file written by the application
+    with open(file_path) as f:
+        header = f.readline().strip().split(",")
+    columns = [header.index(name) for name in names]
+    data = np.loadtxt(file_path, delimiter=",", skiprows=1, usecols=columns, ndmin=2)
+    return [data[:, i] for i in range(len(names))]
+
+
+class SessionCache:    # Multi-resolution trend summary and lazily filled trace index of one session folder, cached on disk
+
+    def __init__(self, session_directory):
+        self.session_directory = session_directory
+        self.cache_directory = path.join(session_directory, CACHE_FOLDER)
+        if not path.exists(self.cache_directory):
+            mkdir(self.cache_directory)
+
+        self.levels = []  # Level 0 is every sweep, [elapsed minutes, mean, min and max inflection frequency MHz, S11 dB]
+        self.sweep_files = []
+        self.frequency = None
+        self.traces = None  # Memory-mapped [sweep, point] S11 values, filled as sweeps are viewed
+        self.trace_loaded = None
+
+        self.load_trend()
+        self.load_trace_index()
+
+    # Trend Summary =======================================================================================
+    def load_trend(self):
+        log_path = path.join(self.session_directory, "0_data_log.txt")
+        summary_path = path.join(self.cache_directory, "trend_summary.npz")
+        if not path.exists(log_path):
+            return
+        log_stat = [path.getsize(log_path), path.getmtime(log_path)]
+
+        if path.exists(summary_path):
+            with np.load(summary_path) as summary:
+                if summary["log_stat"].tolist() == log_stat:  # Data log has not changed since the summary was built
+                    self.levels = [summary[f"level_{i}"] for i in range(int(summary["number_of_levels"]))]
+                    return
+
+        elapsed, inflection_frequency, s11 = read_columns(log_path, ['Elapsed Times [s]', 'Inflection Frequency [Hz]', 'S11 at Inflection Frequency [dB]'])
+        level = np.column_stack((elapsed / 60, inflection_frequency / 1e6, inflection_frequency / 1e6, inflection_frequency / 1e6, s11))
+        self.levels = [level]
+        while len(level) > LEVEL_FACTOR:
+            blocks = len(level) // LEVEL_FACTOR
+            grouped = level[:blocks * LEVEL_FACTOR].reshape(blocks, LEVEL_FACTOR, level.shape[1])
+            level = np.column_stack((grouped[:, :, 0].mean(axis=1), grouped[:, :, 1].mean(axis=1), grouped[:, :, 2].min(axis=1),
+                                     grouped[:, :, 3].max(axis=1), grouped[:, :, 4].mean(axis=1)))
+            self.levels.append(level)
+
+        np.savez(summary_path, log_stat=np.array(log_stat), number_of_levels=len(self.levels), **{f"level_{i}": x for i, x in enumerate(self.levels)})
+
+    def trend(self, max_points, start_minutes=None, end_minutes=None):  # Finest level that fits in max_points over the time range
+        if len(self.levels) == 0:
+            return np.empty((0, 5))
+        for level in self.levels:
+            rows = level
+            if start_minutes is not None:
+                rows = rows[rows[:, 0] >= start_minutes]
+            if end_minutes is not None:
+                rows = rows[rows[:, 0] <= end_minutes]
+            if len(rows) <= max_points:
+                return rows
+        return rows
+
+    # Trace Index =========================================================================================
+    def load_trace_index(self):
+        index_path = path.join(self.cache_directory, "trace_index.json")
+        sweep_files = [f for f in listdir(self.session_directory) if f.endswith(".txt") and sweep_number(f) > 0]
+        sweep_files.sort(key=sweep_number)
+        if len(sweep_files) == 0:
+            return
+
+        old_files = []
+        if path.exists(index_path):
+            with open(index_path) as f:
+                old_files = json.load(f)["sweep_files"]
+
+        traces_path = path.join(self.cache_directory, "s11_traces.npy")
+        loaded_path = path.join(self.cache_directory, "trace_loaded.npy")
+        frequency_path = path.join(self.cache_directory, "frequency.npy")
+
+        if old_files == sweep_files and path.exists(traces_path):  # Nothing new, the cached index is used as is
+            self.frequency = np.load(frequency_path)
+            self.traces = np.load(traces_path, mmap_mode="r+")
+            self.trace_loaded = np.load(loaded_path, mmap_mode="r+")
+            self.sweep_files = sweep_files
+            return
+
+        if old_files == sweep_files[:len(old_files)] and path.exists(traces_path):  # Session grew, keeps the traces already read
+            self.frequency = np.load(frequency_path)
+            old_traces = np.array(np.load(traces_path, mmap_mode="r"))
+            old_loaded = np.array(np.load(loaded_path, mmap_mode="r"))
+        else:
+            self.frequency = read_columns(path.join(self.session_directory, sweep_files[0]), ['Frequency [Hz]'])[0]
+            np.save(frequency_path, self.frequency)
+            old_traces = np.empty((0, len(self.frequency)), dtype=np.float32)
+            old_loaded = np.zeros(0, dtype=bool)
+
+        # Built under a temporary name and swapped in, the files being replaced may still be mapped until they are closed
+        for file_path, old_values, shape in ((traces_path, old_traces, (len(sweep_files), len(self.frequency))), (loaded_path, old_loaded, (len(sweep_files),))):
+            new_values = np.lib.format.open_memmap(file_path + ".tmp", mode="w+", dtype=old_values.dtype, shape=shape)
+            new_values[:len(old_values)] = old_values
+            new_values.flush()
+            del new_values  # Unmapped before the rename, Windows does not rename a mapped file
+            replace(file_path + ".tmp", file_path)
+        self.traces = np.load(traces_path, mmap_mode="r+")
+        self.trace_loaded = np.load(loaded_path, mmap_mode="r+")
+
+        self.sweep_files = sweep_files
+        with open(index_path, "w") as f:
+            json.dump({"sweep_files": sweep_files}, f)
+
+    def close(self):  # Releases the memory-mapped files, needed before another cache of the same session rebuilds them
+        if self.traces is not None:
+            self.traces.flush()
+            self.trace_loaded.flush()
+        self.traces = None
+        self.trace_loaded = None
+
+    def __len__(self):
+        return len(self.sweep_files)
+
+    def trace(self, sweep_index):  # Frequency and S11 of one sweep, the sweep file is only read the first time
+        if not self.trace_loaded[sweep_index]:
+            frequency, s11 = read_columns(path.join(self.session_directory, self.sweep_files[sweep_index]), ['Frequency [Hz]', 'S11 [dB]'])
+            if len(s11) != self.traces.shape[1]:  # Sweep has a different number of points, it is not cached
+                return frequency, s11
+            self.traces[sweep_index] = s11
+            self.trace_loaded[sweep_index] = True
+        return self.frequency, self.traces[sweep_index]
+
+
+class SessionBrowserWidget(QWidget):    # Window used to look through a past measurement session
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Session Browser")  # Set Window Title
+        self.setWindowIcon(QIcon("Resources\\PlotIcon.png"))
+        self.resize(1250, 800)  # Set Window Size
+
+        self.session = None
+
+        # Font used for Graphs ================================================
+        self.graph_font = QFont()
+        self.graph_font.setPointSize(6)
+
+        # Trend Graph =========================================================
+        self.time_elapsed_axis = QValueAxis()
+        self.time_elapsed_axis.setLabelFormat("%0.1f")
+        self.time_elapsed_axis.setLabelsFont(self.graph_font)
+        self.time_elapsed_axis.setTitleText("Time Elapsed [min]")
+        self.inflection_frequency_axis = QValueAxis()
+        self.inflection_frequency_axis.setLabelFormat("%0.1f")
+        self.inflection_frequency_axis.setLabelsFont(self.graph_font)
+        self.inflection_frequency_axis.setTitleText("Inflection Frequency [MHz]")
+
+        self.inflection_frequency_series = QLineSeries()
+        self.selected_sweep_series = QLineSeries()  # Vertical line at the sweep being viewed
+
+        self.trend_graph = QChart()
+        self.trend_graph.setTitle('Inflection Frequency Over Time')
+        self.trend_graph.legend().hide()
+        self.trend_graph.addAxis(self.time_elapsed_axis, Qt.AlignmentFlag.AlignBottom)
+        self.trend_graph.addAxis(self.inflection_frequency_axis, Qt.AlignmentFlag.AlignLeft)
+        for series in (self.inflection_frequency_series, self.selected_sweep_series):
+            self.trend_graph.addSeries(series)
+            series.attachAxis(self.time_elapsed_axis)
+            series.attachAxis(self.inflection_frequency_axis)
+        self.trend_graph_view = QChartView(self.trend_graph)
+        self.trend_graph_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # S11 Graph ===========================================================
+        self.frequency_axis = QValueAxis()
+        self.frequency_axis.setRange(0.85, 4)  # Sets graph from 0.85-4 GHz
+        self.frequency_axis.setLabelFormat("%0.2f")
+        self.frequency_axis.setLabelsFont(self.graph_font)
+        self.frequency_axis.setTickType(QValueAxis.TickType.TicksFixed)
+        self.frequency_axis.setTickCount(21)
+        self.frequency_axis.setTitleText("Frequency [GHz]")
+        self.s11_mag_axis = QValueAxis()
+        self.s11_mag_axis.setRange(-40, 0)
+        self.s11_mag_axis.setLabelFormat("%0.1f")
+        self.s11_mag_axis.setLabelsFont(self.graph_font)
+        self.s11_mag_axis.setTickType(QValueAxis.TickType.TicksFixed)
+        self.s11_mag_axis.setTickCount(11)
+        self.s11_mag_axis.setTitleText("S11 [dB]")
+
+        self.s11_series = QLineSeries()
+
+        self.s11_graph = QChart()
+        self.s11_graph.setTitle('Antenna Reflection Data')
+        self.s11_graph.legend().hide()
+        self.s11_graph.addAxis(self.frequency_axis, Qt.AlignmentFlag.AlignBottom)
+        self.s11_graph.addAxis(self.s11_mag_axis, Qt.AlignmentFlag.AlignLeft)
+        self.s11_graph.addSeries(self.s11_series)
+        self.s11_series.attachAxis(self.frequency_axis)
+        self.s11_series.attachAxis(self.s11_mag_axis)
+        self.s11_graph_view = QChartView(self.s11_graph)
+        self.s11_graph_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Buttons and Slider ==================================================
+        open_session_button = QPushButton("Open Session")
+        open_session_button.clicked.connect(self.open_session)
+        self.session_label = QLabel("No Session Open")
+
+        self.sweep_slider = QSlider(Qt.Orientation.Horizontal)  # Used to scrub through the sweeps of the session
+        self.sweep_slider.setEnabled(False)
+        self.sweep_slider.valueChanged.connect(self.show_sweep)
+
+        # Layout ==============================================================
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(open_session_button)
+        button_layout.addWidget(self.session_label)
+        button_layout.setStretchFactor(self.session_label, 1)
+
+        full_layout = QVBoxLayout()
+        full_layout.addLayout(button_layout)
+        full_layout.addWidget(self.trend_graph_view)
+        full_layout.addWidget(self.sweep_slider)
+        full_layout.addWidget(self.s11_graph_view)
+        self.setLayout(full_layout)
+
+    def open_session(self):
+        session_directory = QFileDialog.getExistingDirectory(self, "Open Session", getcwd() + "\\Measurement_Data")
+        if session_directory == "":
+            return
+        if self.session is not None:
+            self.session.close()  # Same session opened again rebuilds the files it has mapped
+            self.session = None
+        self.session = SessionCache(path.normpath(session_directory))
+        self.session_label.setText(f"{path.basename(path.normpath(session_directory))}: {len(self.session)} sweeps")
+
+        # Trend drawn at about two points per pixel of the graph, from the cached summary
+        trend = self.session.trend(max(self.trend_graph_view.width() * 2, 100))
+        self.inflection_frequency_series.replace([QPointF(t, f) for t, f in zip(trend[:, 0].tolist(), trend[:, 1].tolist())])
+        if len(trend) > 0:
+            self.time_elapsed_axis.setRange(trend[0, 0], max(trend[-1, 0], trend[0, 0] + 1))
+            self.inflection_frequency_axis.setRange(trend[:, 2].min() - 5, trend[:, 3].max() + 5)
+
+        self.sweep_slider.setEnabled(len(self.session) > 0)
+        self.sweep_slider.setRange(0, max(len(self.session) - 1, 0))
+        self.sweep_slider.setValue(0)
+        self.show_sweep(0)
+
+    def show_sweep(self, sweep_index):
+        if self.session is None or len(self.session) == 0:
+            return
+        frequency, s11 = self.session.trace(sweep_index)
+        self.s11_series.replace([QPointF(f / 1e9, s) for f, s in zip(frequency.tolist(), s11.tolist())])
+        self.s11_graph.setTitle(f'Antenna Reflection Data: {self.session.sweep_files[sweep_index]}')
+
+        # Marks the time of the sweep on the trend graph, sweeps and data log rows are written together
+        if len(self.session.levels) > 0 and sweep_index < len(self.session.levels[0]):
+            sweep_time = self.session.levels[0][sweep_index, 0]
+            self.selected_sweep_series.replace([QPointF(sweep_time, self.inflection_frequency_axis.min()), QPointF(sweep_time, self.inflection_frequency_axis.max())])
@@ -0,0 +1,336 @@
+# Soak test harness for long measurement sessions
+# Runs MeasurementThread, RVNAMainWindow.graphing and the outbox ServerTransferThread against a simulated instrument and a local
+# folder standing in for the SFTP server, with a simulated clock so days of sweeps run in minutes. RSS, per-sweep latency,
+# open file handles and the upload backlog are sampled as it runs, and the test fails if any of them keeps growing.
+# Usage:
+#   python RVNA_SoakTest.py --days 2 --interval 10
+#   python RVNA_SoakTest.py --days 1 --outage-minutes 60 --outage-period-minutes 720
+
+# Imports from python packages
+from datetime import datetime, timedelta
+from os import path, listdir, remove, makedirs, chdir, getpid, environ, _exit
+import argparse
+import csv
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # The main window is built but never shown on screen
+
+import numpy as np
+
+
+class SimulatedClock:    # Stands in for the time module and datetime.now in RVNA_MainWindow, advanced one sweep interval at a time
+
+    def __init__(self):
+        self.start = datetime(2024, 1, 1, 8, 0, 0)
+        self.seconds = 0.0
+
+    def time(self):
+        return self.seconds
+
+    def now(self):
+        return self.start + timedelta(seconds=self.seconds)
+
+    def advance(self, seconds):
+        self.seconds += seconds
+
+
+class SimulatedInstrument:    # Answers the SCPI commands the application sends with a slowly drifting antenna resonance
+
+    def __init__(self, clock, points=1601):
+        self.clock = clock
+        self.frequency = np.linspace(0.85e9, 4e9, points)
+        self.selected_trace = 3
+        self.read_termination = '\n'
+        self.timeout = 10000
+        self.rng = np.random.default_rng(0)
+        self.electrical_delays = {1: 6.4e-11, 2: 0.0}  # Same as Calfile.cfg, only applied to the formatted (FDAT) data like the RVNA does
+
+    def write(self, command):
+        if command.startswith("CALC1:PAR") and command.endswith(":SEL"):
+            self.selected_trace = int(command[len("CALC1:PAR")])
+        return len(command)
+
+    def query(self, command):
+        if command.startswith("SYST:TEMP"):
+            return "35.0"
+        if command.startswith("CALC1:TRAC") and command.endswith(":CORR:EDEL:TIME?"):
+            return repr(self.electrical_delays[int(command[len("CALC1:TRAC")])])
+        return "1"
+
+    def reflection(self):  # Complex S11 of a resonance near 1.2 GHz that drifts a few MHz per hour
+        resonance = 1.2e9 + 2e6 * np.sin(self.clock.seconds / 3600)
+        detuning = (self.frequency - resonance) / 4e7
+        gamma = (0.05 + 1j * detuning) / (1 + 1j * detuning) * 0.95
+        return gamma + self.rng.normal(scale=0.002, size=len(gamma)) + 1j * self.rng.normal(scale=0.002, size=len(gamma))
+
+    def query_ascii_values(self, command):
+        if command == "SENS1:FREQ:DATA?":
+            return self.frequency.tolist()
+        gamma = self.reflection()
+        data = np.zeros((len(gamma), 2))
+        if command == "CALC1:DATA:SDAT?":  # Complex data, used by burst averaging
+            data[:, 0] = gamma.real
+            data[:, 1] = gamma.imag
+        elif self.selected_trace == 1:  # Phase
+            data[:, 0] = np.degrees(np.angle(gamma * np.exp(2j * np.pi * self.frequency * self.electrical_delays[1])))
+        elif self.selected_trace == 2:  # Smith chart, real and imaginary impedance
+            gamma = gamma * np.exp(2j * np.pi * self.frequency * self.electrical_delays[2])
+            impedance = 50 * (1 + gamma) / (1 - gamma)
+            data[:, 0] = impedance.real
+            data[:, 1] = impedance.imag
+        else:  # Log magnitude
+            data[:, 0] = 20 * np.log10(np.abs(gamma))
+        return data.ravel().tolist()
+
+
+class LocalSFTPClient:    # Stands in for paramiko's SFTPClient, remote paths are kept under a local folder
+
+    def __init__(self, root, server):
+        self.root = root
+        self.server = server
+        self.cwd = "/"
+
+    def local(self, remote_path):
+        if not remote_path.startswith("/"):
+            remote_path = self.cwd.rstrip("/") + "/" + remote_path
+        return path.join(self.root, *[p for p in remote_path.split("/") if p != ""])
+
+    def check(self):
+        if not self.server.available:
+            raise IOError("Simulated server outage")
+
+    def chdir(self, remote_path):
+        self.check()
+        remote_path = remote_path if remote_path.startswith("/") else self.cwd.rstrip("/") + "/" + remote_path
+        if not path.isdir(self.local(remote_path)):
+            raise IOError("No such folder")
+        self.cwd = remote_path
+
+    def mkdir(self, remote_path):
+        self.check()
+        makedirs(self.local(remote_path))
+
+    def getcwd(self):
+        return self.cwd
+
+    def stat(self, remote_path):
+        self.check()
+        if not path.exists(self.local(remote_path)):
+            raise IOError("No such file")
+        return type("Stat", (), {"st_size": path.getsize(self.local(remote_path))})()
+
+    def chmod(self, remote_path, mode):
+        self.stat(remote_path)
+
+    def listdir(self, remote_path="."):
+        self.check()
+        return listdir(self.local(remote_path))
+
+    def open(self, remote_path, mode):
+        self.check()
+        return open(self.local(remote_path), mode)
+
+    def put(self, local_path, remote_path, callback=None):
+        self.check()
+        shutil.copyfile(local_path, self.local(remote_path))
+        if callback is not None:
+            size = path.getsize(local_path)
+            callback(size, size)
+
+
+class LocalServer:    # Tracks whether the simulated server is reachable
+
+    def __init__(self, root):
+        self.root = root
+        self.available = True
+        makedirs(root, exist_ok=True)
+
+
+def resident_memory_mb():
+    try:
+        import psutil
+        return psutil.Process(getpid()).memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            import resource
+            return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+    except OSError:
+        return float("nan")
+
+
+def open_file_handles():
+    try:
+        import psutil
+        process = psutil.Process(getpid())
+        return process.num_handles() if hasattr(process, "num_handles") else process.num_fds()
+    except ImportError:
+        pass
+    try:
+        return len(listdir("/proc/self/fd"))
+    except OSError:
+        return float("nan")
+
+
+def growth(samples, name, warmup):  # Median of the last tenth minus median of the first tenth after warm up, in samples
+    values = [s[name] for s in samples[warmup:]]
+    if len(values) < 20:
+        return 0.0
+    tenth = len(values) // 10
+    return statistics.median(values[-tenth:]) - statistics.median(values[:tenth])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-compressed soak test of the measurement, graphing and upload paths")
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated session length in days")
+    parser.add_argument("--interval", type=float, default=10.0, help="Simulated seconds between sweeps")
+    parser.add_argument("--upload-every", type=int, default=1, help="Sweeps between upload passes")
+    parser.add_argument("--keep-files", type=int, default=200, help="Sweep files kept on disk once uploaded, bounds disk use")
+    parser.add_argument("--sample-every", type=int, default=50, help="Sweeps between metric samples")
+    parser.add_argument("--outage-minutes", type=float, default=0.0, help="Simulated server outage length")
+    parser.add_argument("--outage-period-minutes", type=float, default=720.0, help="Simulated time from one outage to the next")
+    parser.add_argument("--burst-sweeps", type=int, default=1, help="Sweeps averaged per measurement")
+    parser.add_argument("--warmup-sweeps", type=int, default=2500, help="Sweeps left out of the growth checks, the trend graph fills the history in this time")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=50.0)
+    parser.add_argument("--max-latency-growth-ms", type=float, default=20.0)
+    parser.add_argument("--max-handle-growth", type=float, default=5.0)
+    parser.add_argument("--max-final-backlog", type=int, default=3, help="Outbox entries allowed to be left at the end")
+    parser.add_argument("--work", default=None, help="Working folder (default: a new temporary folder)")
+    parser.add_argument("--report", default="soak_report.csv", help="CSV file the samples are written to")
+    args = parser.parse_args()
+
+    work = args.work if args.work is not None else tempfile.mkdtemp(prefix="rvna_soak_")
+    report_path = path.abspath(args.report)
+    application_directory = path.dirname(path.abspath(__file__))
+    sys.path.insert(0, application_directory)
+    makedirs(path.join(work, "Measurement_Data", "soak"), exist_ok=True)
+    chdir(work)  # The outbox and catalog are created in the working folder
+
+    from PySide6.QtWidgets import QApplication
+    import RVNA_MainWindow
+    from RVNA_MainWindow import RVNAMainWindow, MeasurementThread, ServerTransferThread
+    from RVNA_Catalog import SessionCatalog
+    from RVNA_Acquisition import SweepRing, publish_sweep
+    import RVNA_Housekeeping
+    from RVNA_Housekeeping import HousekeepingCache, HousekeepingThread, HOUSEKEEPING_INTERVAL
+
+    # Simulated instrument and clock ===================================================================
+    clock = SimulatedClock()
+    RVNA_MainWindow.time = clock
+    RVNA_MainWindow.datetime = clock
+    RVNA_MainWindow.CMT = SimulatedInstrument(clock)
+    RVNA_Housekeeping.time = clock
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = RVNAMainWindow(app)
+
+    measurement_directory = path.join(work, "Measurement_Data", "soak")
+    MeasurementThread.measurements_directory = measurement_directory
+    MeasurementThread.burst_sweeps = args.burst_sweeps
+    ServerTransferThread.new_session(measurement_directory)
+    # The acquisition process is replaced by calling its steps directly, the sweeps still reach the window through the ring
+    measurement = MeasurementThread(window.smoothing)
+    measurement.catalog = SessionCatalog(path.join(work, "catalog.db"))
+    written_files = []
+    measurement.measurements_filedirectory.connect(lambda files: written_files.append(files[0]))
+    sweep_ring = SweepRing(max_points=1601, create=True)
+
+    # Housekeeping readings are taken directly once every HOUSEKEEPING_INTERVAL simulated seconds instead of by the thread
+    MeasurementThread.housekeeping = HousekeepingCache()
+    housekeeping = HousekeepingThread(RVNA_MainWindow.CMT, threading.Lock(), MeasurementThread.housekeeping)
+    next_housekeeping = 0.0
+    window.attach_sweep_ring(sweep_ring)
+
+    # Upload thread is run directly after each sweep instead of in the background ======================
+    server = LocalServer(path.join(work, "server"))
+    uploader = window.upload_transfer
+    uploader.request_transfer = lambda: None
+
+    def connect_to_local_server():
+        if not server.available:
+            return False
+        uploader.sftp_session = LocalSFTPClient(server.root, server)
+        uploader.connection_var = 1
+        uploader.remote_folder = None
+        return True
+
+    uploader.connect_to_server = connect_to_local_server
+
+    total_sweeps = int(args.days * 86400 / args.interval)
+    samples = []
+    sweep_files = []
+    print(f"Running {total_sweeps} sweeps ({args.days} simulated days) in {work}")
+    wall_start = time.perf_counter()
+
+    for sweep in range(1, total_sweeps + 1):
+        minutes = clock.seconds / 60
+        server.available = not (args.outage_minutes > 0 and minutes % args.outage_period_minutes < args.outage_minutes)
+
+        if clock.seconds >= next_housekeeping:
+            housekeeping.poll()
+            next_housekeeping += HOUSEKEEPING_INTERVAL
+
+        sweep_start = time.perf_counter()
+        measurement.run()
+        publish_sweep(sweep_ring, uploader.outbox, measurement, written_files.pop())  # Writes the sweep to the ring and queues its uploads
+        window.read_sweep_ring()  # Reads the sweep back and draws the graphs
+        if sweep % args.upload_every == 0:
+            uploader.run()
+        latency_ms = (time.perf_counter() - sweep_start) * 1000
+
+        # Removes old sweep files once they are uploaded so disk use stays bounded
+        sweep_files.append(ServerTransferThread.session_files[-1])
+        if len(sweep_files) > args.keep_files and uploader.outbox.pending_count() == 0:
+            for file_name in sweep_files[:-args.keep_files]:
+                for folder in (measurement_directory, path.join(server.root, "soak")):
+                    for candidate in (path.join(folder, file_name), measurement_directory + "\\" + file_name):
+                        if path.exists(candidate):
+                            remove(candidate)
+            del sweep_files[:-args.keep_files]
+
+        if sweep % args.sample_every == 0 or sweep == total_sweeps:
+            samples.append({"sweep": sweep, "simulated_hours": clock.seconds / 3600, "rss_mb": resident_memory_mb(),
+                            "latency_ms": latency_ms, "file_handles": open_file_handles(),
+                            "upload_backlog": uploader.outbox.pending_count(), "server_available": int(server.available)})
+            if len(samples) % 20 == 0:
+                s = samples[-1]
+                print(f"{s['simulated_hours']:8.1f} h  RSS {s['rss_mb']:7.1f} MB  latency {s['latency_ms']:7.1f} ms  "
+                      f"handles {s['file_handles']}  backlog {s['upload_backlog']}")
+        clock.advance(args.interval)
+
+    # Final upload pass once the server is back
+    server.available = True
+    uploader.run()
+    final_backlog = uploader.outbox.pending_count()
+
+    with open(report_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(samples[0].keys()))
+        writer.writeheader()
+        writer.writerows(samples)
+
+    # Growth checks ======================================================================================
+    warmup = min(args.warmup_sweeps // args.sample_every, len(samples) // 2)
+    results = [("RSS growth [MB]", growth(samples, "rss_mb", warmup), args.max_rss_growth_mb),
+               ("Per-sweep latency growth [ms]", growth(samples, "latency_ms", warmup), args.max_latency_growth_ms),
+               ("File handle growth", growth(samples, "file_handles", warmup), args.max_handle_growth),
+               ("Final upload backlog", final_backlog, args.max_final_backlog)]
+
+    print(f"\n{total_sweeps} sweeps in {time.perf_counter() - wall_start:.1f} s, samples written to {report_path}")
+    failed = False
+    for name, value, limit in results:
+        passed = value <= limit
+        failed = failed or not passed
+        print(f"{'PASS' if passed else 'FAIL'}  {name}: {value:.2f} (limit {limit})")
+    sys.stdout.flush()
+    sweep_ring.close()
+    _exit(1 if failed else 0)  # Skips interpreter teardown, so Qt and numpy objects are not destroyed in an arbitrary order
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Startup benchmark for the RVNA Reading Application
+# Usage:
+#   python RVNA_StartupBenchmark.py                                  (runs RVNA_App.py with this python)
+#   python RVNA_StartupBenchmark.py --exe dist\RVNA_App\RVNA_App.exe  (runs the PyInstaller bundle)
+#   python RVNA_StartupBenchmark.py --runs 10
+
+# Imports from python packages
+from os import path, remove, environ
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def run_once(command):
+    # The application writes the time from its first line until the window is shown, then closes itself
+    result_file = path.join(tempfile.gettempdir(), "rvna_startup_benchmark.txt")
+    if path.exists(result_file):
+        remove(result_file)
+    env = dict(environ, RVNA_STARTUP_BENCHMARK=result_file)
+
+    launch_time = time.perf_counter()
+    subprocess.run(command, env=env, cwd=path.dirname(path.abspath(__file__)), timeout=120)
+    total_time = time.perf_counter() - launch_time  # Includes interpreter start up (and unpacking for the bundle) and shut down
+
+    with open(result_file) as f:
+        window_time = float(f.read().split()[0])
+    remove(result_file)
+    return window_time, total_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures how long the RVNA Reading Application takes to show its window")
+    parser.add_argument("--exe", default=None, help="Path of the PyInstaller bundle to benchmark instead of RVNA_App.py")
+    parser.add_argument("--runs", type=int, default=5, help="Number of times the application is started")
+    args = parser.parse_args()
+
+    if args.exe is not None:
+        command = [args.exe]
+    else:
+        command = [sys.executable, path.join(path.dirname(path.abspath(__file__)), "RVNA_App.py")]
+
+    window_times = []
+    total_times = []
+    for i in range(args.runs):
+        window_time, total_time = run_once(command)
+        window_times.append(window_time)
+        total_times.append(total_time)
+        print(f"Run {i + 1}: window shown after {window_time:.3f} s, launch to exit {total_time:.3f} s")
+
+    print(f"Window shown   min {min(window_times):.3f} s, median {statistics.median(window_times):.3f} s, max {max(window_times):.3f} s")
+    print(f"Launch to exit min {min(total_times):.3f} s, median {statistics.median(total_times):.3f} s, max {max(total_times):.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Fast writer of the per-sweep s-parameter files, gives the same bytes as the pandas DataFrame.to_csv call it replaces
+# Benchmark against pandas:
+#   python RVNA_SweepWriter.py
+#   python RVNA_SweepWriter.py --points 10001 --runs 50
+#   python RVNA_SweepWriter.py --in-memory   (formatting only, no files)
+# Opening and writing the file costs the same for both writers, on a slow disk it takes most of the time and the gain is small
+
+# Imports from python packages
+from os import path, remove, linesep
+import argparse
+import io
+import tempfile
+import time
+import numpy as np
+
+# Columns of an s-parameter file, in the order they are written
+SWEEP_FILE_COLUMNS = ['Current Hour', 'Current Minute', 'Current Second', 'Inflection Frequency [Hz]', 'Frequency [Hz]', 'S11 [dB]',
+                      'S11 Phase [DEG]', 'Zin [RE ohm]', 'Zin [IM ohm]', 'S11 at Inflection Frequency [dB]', 'Inflection Impedance [RE ohm]', 'VNA Temp [F]']
+
+
+def format_value(value):  # Same text pandas writes for a float, missing values are left empty
+    value = float(value)
+    return "" if value != value else repr(value)
+
+
+def write_sweep_file(file_path, hour, minute, second, frequency, s11, phase, real_impedance, imaginary_impedance,
+                     inflection_frequency, s11_at_inflection, inflection_impedance, vna_temp):
+    text = sweep_file_text(hour, minute, second, frequency, s11, phase, real_impedance, imaginary_impedance,
+                           inflection_frequency, s11_at_inflection, inflection_impedance, vna_temp)
+    with open(file_path, 'w', newline='') as f:  # Lines end with os.linesep like to_csv
+        f.write(text)
+
+
+def sweep_file_text(hour, minute, second, frequency, s11, phase, real_impedance, imaginary_impedance,
+                    inflection_frequency, s11_at_inflection, inflection_impedance, vna_temp):
+    # Values that are the same on every row are formatted once and reused
+    prefix = f"{int(hour)},{int(minute)},{int(second)},{format_value(inflection_frequency)},"
+    suffix = f",{format_value(s11_at_inflection)},{format_value(inflection_impedance)},{format_value(vna_temp)}"
+
+    # Every row is filled in from one format string, %r gives the same shortest round-trip text as pandas
+    sweep = np.column_stack((frequency, s11, phase, real_impedance, imaginary_impedance)).astype(float)
+    values = tuple(sweep.ravel().tolist())
+    row_format = prefix + "%r,%r,%r,%r,%r" + suffix + linesep
+    if np.isnan(sweep).any():  # Rare, missing values need the slower per-value formatting
+        values = tuple(format_value(value) for value in values)
+        row_format = row_format.replace("%r", "%s")
+
+    return ','.join(SWEEP_FILE_COLUMNS) + linesep + (row_format * len(sweep)) % values
+
+
+def write_sweep_file_pandas(file_path, hour, minute, second, frequency, s11, phase, real_impedance, imaginary_impedance,
+                            inflection_frequency, s11_at_inflection, inflection_impedance, vna_temp):
+    # The way the files were written before, kept for the benchmark, file_path can also be a text buffer
+    import pandas as pd
+    number_of_points = len(frequency)
+    data_frame = pd.DataFrame({'Current Hour': [int(hour)] * number_of_points, 'Current Minute': [int(minute)] * number_of_points,
+                               'Current Second': [int(second)] * number_of_points, 'Frequency [Hz]': frequency, 'S11 [dB]': s11,
+                               'S11 Phase [DEG]': phase, 'Zin [RE ohm]': real_impedance, 'Zin [IM ohm]': imaginary_impedance,
+                               'VNA Temp [F]': [vna_temp] * number_of_points})
+    data_frame.insert(3, 'Inflection Frequency [Hz]', [inflection_frequency] * number_of_points)
+    data_frame.insert(9, 'S11 at Inflection Frequency [dB]', [s11_at_inflection] * number_of_points)
+    data_frame.insert(10, 'Inflection Impedance [RE ohm]', [inflection_impedance] * number_of_points)
+    data_frame.to_csv(file_path, index=False, sep=',', header=True)
+
+
+def example_sweep(number_of_points, seed=0):  # Sweep with the value ranges of a real measurement
+    rng = np.random.default_rng(seed)
+    frequency = np.linspace(0.85e9, 4e9, number_of_points)
+    gamma = 0.9 * np.exp(1j * rng.uniform(-np.pi, np.pi, number_of_points)) + rng.normal(scale=0.01, size=number_of_points)
+    impedance = 50 * (1 + gamma) / (1 - gamma)
+    return (8, 30, 15, frequency.tolist(), (20 * np.log10(np.abs(gamma))).tolist(), np.degrees(np.angle(gamma)).tolist(),
+            impedance.real.tolist(), impedance.imag.tolist(), float(frequency[number_of_points // 3]), -12.5, 48.7, 94.93)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares the sweep file writer with the pandas to_csv path it replaces")
+    parser.add_argument("--points", type=int, default=1601, help="Points per sweep")
+    parser.add_argument("--runs", type=int, default=20, help="Number of files written by each writer")
+    parser.add_argument("--directory", default=tempfile.gettempdir(), help="Folder the files are written to, the disk it is on sets the file cost")
+    parser.add_argument("--in-memory", action="store_true", help="Times only the formatting, the text is not written to a file")
+    args = parser.parse_args()
+
+    sweep = example_sweep(args.points)
+    if args.in_memory:
+        writers = (("pandas", lambda: write_sweep_file_pandas(io.StringIO(), *sweep)), ("writer", lambda: sweep_file_text(*sweep)))
+    else:
+        fast_path = path.join(args.directory, "rvna_sweep_writer_fast.txt")
+        pandas_path = path.join(args.directory, "rvna_sweep_writer_pandas.txt")
+        writers = (("pandas", lambda: write_sweep_file_pandas(pandas_path, *sweep)), ("writer", lambda: write_sweep_file(fast_path, *sweep)))
+
+    timings = {}
+    for name, writer in writers:
+        writer()  # First call imports and warms up
+        start_time = time.perf_counter()
+        for i in range(args.runs):
+            writer()
+        timings[name] = (time.perf_counter() - start_time) / args.runs * 1000
+
+    if args.in_memory:
+        pandas_buffer = io.StringIO()
+        write_sweep_file_pandas(pandas_buffer, *sweep)
+        fast_bytes = sweep_file_text(*sweep).encode()
+        pandas_bytes = pandas_buffer.getvalue().encode()
+    else:
+        with open(fast_path, 'rb') as f:
+            fast_bytes = f.read()
+        with open(pandas_path, 'rb') as f:
+            pandas_bytes = f.read()
+        remove(fast_path)
+        remove(pandas_path)
+
+    print(f"{args.points} points, {args.runs} runs, {'formatting only' if args.in_memory else 'written to ' + args.directory}")
+    print(f"  pandas to_csv: {timings['pandas']:8.2f} ms per file")
+    print(f"  sweep writer:  {timings['writer']:8.2f} ms per file ({timings['pandas'] / timings['writer']:.1f}x faster)")
+    print(f"  identical output: {fast_bytes == pandas_bytes}")
+
+
+if __name__ == "__main__":
+    main()
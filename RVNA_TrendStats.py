@@ -0,0 +1,130 @@
+# Imports from python packages
+from collections import deque
+import math
+
+ROLLING_WINDOWS = (5, 10, 30, 60)  # Rolling averages kept for every sweep, the graph can switch between them instantly
+
+# Columns added to the data log for each sweep, in the order they are written
+TREND_COLUMNS = [f'Inflection Frequency Rolling Mean {window} [Hz]' for window in ROLLING_WINDOWS] + \
+                ['Inflection Frequency EWMA [Hz]', 'Drift Rate [MHz/min]', 'Tracked Inflection Frequency [Hz]', 'Tracked Drift Rate [MHz/min]']
+
+
+def rolling_mean_column(window):  # Data log column holding the rolling average for a window, None if it is not kept
+    return f'Inflection Frequency Rolling Mean {window} [Hz]' if window in ROLLING_WINDOWS else None
+
+
+class RollingMean:    # Average of the last window values, constant cost per update
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, value):
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        self.updates += 1
+        if self.updates % (self.window * 64) == 0:  # Re-adds the window now and then so rounding errors cannot build up
+            self.total = math.fsum(self.values)
+        return self.mean()
+
+    def mean(self):  # NaN until the window is full, like pandas rolling
+        return self.total / self.window if len(self.values) == self.window else float("nan")
+
+
+class SlidingTrend:    # Least squares slope of the last window points, kept from running sums so each update is constant cost
+
+    def __init__(self, window):
+        self.window = window
+        self.points = deque()
+        self.origin = None  # Times are taken relative to the first point to keep the sums well conditioned
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+
+    def update(self, t, y):
+        if self.origin is None:
+            self.origin = (t, y)
+        t -= self.origin[0]
+        y -= self.origin[1]
+        self.points.append((t, y))
+        self.add(t, y, 1)
+        if len(self.points) > self.window:
+            self.add(*self.points.popleft(), -1)
+        return self.slope()
+
+    def add(self, t, y, sign):
+        self.sum_t += sign * t
+        self.sum_y += sign * y
+        self.sum_tt += sign * t * t
+        self.sum_ty += sign * t * y
+
+    def slope(self):
+        n = len(self.points)
+        denominator = n * self.sum_tt - self.sum_t * self.sum_t
+        if n < 2 or denominator <= 0:
+            return float("nan")
+        return (n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+
+class ResonanceTracker:    # Constant velocity Kalman filter of the inflection frequency, state is frequency [Hz] and drift [Hz/s]
+
+    # A reading scatters by about one frequency point, 0.85-4 GHz over 1601 points is ~2 MHz, so the rounding alone is ~2 MHz^2/12
+    # With a smaller measurement noise the filter follows every reading and the tracked drift swings by tens of MHz/min
+    def __init__(self, process_noise=1e5, measurement_noise=1.5e6 ** 2):
+        self.process_noise = process_noise  # Expected change of the drift rate, (Hz/s)^2 per second
+        self.measurement_noise = measurement_noise  # Variance of a single inflection frequency reading, Hz^2
+        self.state = None
+        self.covariance = None
+        self.last_time = None
+
+    def update(self, t, frequency):
+        if self.state is None:
+            self.state = [frequency, 0.0]
+            self.covariance = [[self.measurement_noise, 0.0], [0.0, self.measurement_noise]]
+            self.last_time = t
+            return self.state
+
+        # Predict
+        dt = max(t - self.last_time, 1e-9)
+        self.last_time = t
+        f, v = self.state
+        (p00, p01), (p10, p11) = self.covariance
+        f += v * dt
+        p00 += dt * (p10 + p01) + dt * dt * p11 + self.process_noise * dt ** 3 / 3
+        p01 += dt * p11 + self.process_noise * dt ** 2 / 2
+        p10 += dt * p11 + self.process_noise * dt ** 2 / 2
+        p11 += self.process_noise * dt
+
+        # Correct with the measured frequency
+        innovation = frequency - f
+        s = p00 + self.measurement_noise
+        k0, k1 = p00 / s, p10 / s
+        self.state = [f + k0 * innovation, v + k1 * innovation]
+        self.covariance = [[(1 - k0) * p00, (1 - k0) * p01], [p10 - k1 * p00, p11 - k1 * p01]]
+        return self.state
+
+
+class TrendStatistics:    # Streaming statistics of the inflection frequency, updated once per sweep at constant cost
+
+    def __init__(self, windows=ROLLING_WINDOWS, ewma_alpha=0.1, drift_window=30):
+        self.rolling = {window: RollingMean(window) for window in windows}
+        self.ewma_alpha = ewma_alpha
+        self.ewma = None
+        self.drift = SlidingTrend(drift_window)
+        self.tracker = ResonanceTracker()
+        self.latest = dict.fromkeys(TREND_COLUMNS, float("nan"))
+
+    def update(self, elapsed_seconds, frequency):  # Returns the values of TREND_COLUMNS for this sweep
+        if not frequency > 0:  # 0 or NaN means no inflection was found, the sweep is left out of every statistic
+            return [float("nan")] * len(TREND_COLUMNS)
+        for window, rolling_mean in self.rolling.items():
+            self.latest[rolling_mean_column(window)] = rolling_mean.update(frequency)
+        self.ewma = frequency if self.ewma is None else self.ewma + self.ewma_alpha * (frequency - self.ewma)
+        self.latest['Inflection Frequency EWMA [Hz]'] = self.ewma
+        self.latest['Drift Rate [MHz/min]'] = self.drift.update(elapsed_seconds, frequency) * 60 / 1e6
+        tracked_frequency, tracked_drift = self.tracker.update(elapsed_seconds, frequency)
+        self.latest['Tracked Inflection Frequency [Hz]'] = tracked_frequency
+        self.latest['Tracked Drift Rate [MHz/min]'] = tracked_drift * 60 / 1e6
+        return [self.latest[name] for name in TREND_COLUMNS]
@@ -0,0 +1,121 @@
+# Imports from python packages
+from contextlib import closing
+from os import path
+import sqlite3
+import time
+
+# Upload priorities, lower numbers are sent first
+PRIORITY_DATA_LOG = 0  # Live data log, needed for monitoring
+PRIORITY_LATEST_SPARAMS = 1  # Copy of the most recent sweep
+PRIORITY_S_PARAMETERS = 2  # Bulk s-parameter files
+
+# Upload methods
+METHOD_PUT = "put"  # Copies the whole file
+METHOD_APPEND = "append"  # Appends only the bytes not yet on the server (used for the data log)
+
+# Retries of entries that fail while the server is reachable
+MAX_ATTEMPTS = 8  # After this many failures an entry is kept as a dead letter and no longer sent
+RETRY_DELAY = 30  # Seconds before the first retry, doubled after every further failure
+MAX_RETRY_DELAY = 3600
+
+
+class UploadOutbox:    # Persistent on-disk queue of files waiting to be uploaded to the server
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+
+        # Each remote file can only be queued once, queueing it again replaces the older entry
+        with closing(self.connect()) as connection:
+            connection.execute("PRAGMA journal_mode = WAL")  # Kept by the database file
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS outbox ("
+                                   "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                                   "priority INTEGER NOT NULL, "
+                                   "local_path TEXT NOT NULL, "
+                                   "remote_folder TEXT NOT NULL, "
+                                   "remote_name TEXT NOT NULL, "
+                                   "method TEXT NOT NULL, "
+                                   "attempts INTEGER NOT NULL DEFAULT 0, "
+                                   "next_attempt REAL NOT NULL DEFAULT 0, "
+                                   "UNIQUE (remote_folder, remote_name))")
+                columns = [row[1] for row in connection.execute("PRAGMA table_info(outbox)")]
+                if "next_attempt" not in columns:  # Outbox created by an earlier version
+                    connection.execute("ALTER TABLE outbox ADD COLUMN next_attempt REAL NOT NULL DEFAULT 0")
+
+    def connect(self):
+        connection = sqlite3.connect(self.database_path, timeout=10)
+        connection.execute("PRAGMA synchronous = NORMAL")  # With the write-ahead log, commits survive a crash without waiting on the disk
+        return connection
+
+    def enqueue(self, priority, local_path, remote_folder, remote_name, method=METHOD_PUT):
+        self.enqueue_many([(priority, local_path, remote_folder, remote_name, method)])
+
+    def enqueue_many(self, entries):  # Queues (priority, local_path, remote_folder, remote_name, method) entries in one transaction
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO outbox (priority, local_path, remote_folder, remote_name, method) VALUES (?, ?, ?, ?, ?)", entries)
+
+    def next_entry(self):  # Highest priority entry first, oldest first within a priority, entries waiting for a retry or dead are skipped
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT id, priority, local_path, remote_folder, remote_name, method FROM outbox "
+                                      "WHERE attempts < ? AND next_attempt <= ? ORDER BY priority, id LIMIT 1", (MAX_ATTEMPTS, time.time())).fetchone()
+
+    def remove(self, entry_id):  # Called once an entry was uploaded
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def record_failure(self, entry_id):  # Backs the entry off so the entries behind it are still sent
+        with closing(self.connect()) as connection:
+            with connection:
+                attempts = connection.execute("SELECT attempts FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+                if attempts is None:
+                    return
+                delay = min(RETRY_DELAY * 2 ** attempts[0], MAX_RETRY_DELAY)
+                connection.execute("UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?", (time.time() + delay, entry_id))
+
+    def pending_count(self, priority=None):  # Entries still to be sent, dead letters are not counted
+        with closing(self.connect()) as connection:
+            if priority is None:
+                return connection.execute("SELECT COUNT(*) FROM outbox WHERE attempts < ?", (MAX_ATTEMPTS,)).fetchone()[0]
+            return connection.execute("SELECT COUNT(*) FROM outbox WHERE attempts < ? AND priority = ?", (MAX_ATTEMPTS, priority)).fetchone()[0]
+
+    def dead_letters(self):  # Entries that failed MAX_ATTEMPTS times, kept so they can be looked at or queued again
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT id, local_path, remote_folder, remote_name, attempts FROM outbox WHERE attempts >= ? ORDER BY id", (MAX_ATTEMPTS,)).fetchall()
+
+
+def sweep_upload_entries(measurements_directory, file_name):  # Outbox entries of one written sweep
+    user_named_folder = path.basename(measurements_directory)
+    return [(PRIORITY_DATA_LOG, measurements_directory + "\\0_data_log.txt", user_named_folder, "0_data_log.txt", METHOD_APPEND),
+            (PRIORITY_LATEST_SPARAMS, measurements_directory + "\\" + file_name, user_named_folder, "Latest_Sparams.txt", METHOD_PUT),
+            (PRIORITY_S_PARAMETERS, measurements_directory + "\\" + file_name, user_named_folder, file_name, METHOD_PUT)]
+
+
+class BandwidthLimiter:    # Keeps the average upload rate below a set number of bytes per second
+
+    def __init__(self, bytes_per_second=0):
+        self.bytes_per_second = bytes_per_second  # 0 means no limit
+        self.window_start = time.monotonic()
+        self.window_bytes = 0
+
+    def consume(self, number_of_bytes):  # Sleeps long enough for the bytes just sent to fit within the limit
+        if self.bytes_per_second <= 0:
+            return
+        now = time.monotonic()
+        if now - self.window_start > 5:  # Starts a new window so idle time is not saved up as a burst
+            self.window_start = now
+            self.window_bytes = 0
+        self.window_bytes += number_of_bytes
+        wait_time = self.window_bytes / self.bytes_per_second - (now - self.window_start)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def put_callback(self):  # Callback for SFTPClient.put, which reports the total bytes sent so far
+        sent = [0]
+
+        def callback(bytes_transferred, bytes_total):
+            self.consume(bytes_transferred - sent[0])
+            sent[0] = bytes_transferred
+
+        return callback